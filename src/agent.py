@@ -1,80 +1,260 @@
+import asyncio
+import functools
 import json
+import time
+from collections import OrderedDict
 from textwrap import dedent
-from typing import List, Optional
-from openai import OpenAI
-from openai.lib._parsing._completions import type_to_response_format_param
-from openai.types.chat.parsed_function_tool_call import ParsedFunctionToolCall
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 from cli import PokedexCLI
+from memory import ConversationMemory
+from rate_limit import RateLimiter
+from tokens import truncate_to_tokens
 from tools.pokemon_types import PokemonType
-from tools.tool import Tool
+from tools.projection import compile_field_spec, drop_redundant_urls
+from tools.router import ToolRouter
+from tools.selective_json import Record, to_builtin
+from tools.tool import Tool, ToolUnavailableError
+from tracing import tracer
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 class PokemonAgentResponse(BaseModel):
     thought: Optional[str] = Field(default=None, description="Agent's internal reasoning step.")
     final_answer: Optional[str] = Field(default=None, description="The final answer to the user's question.")
-    tool_fields: Optional[list[str]] = Field(default=None, description="List of relevant field names (e.g., 'types') to include when making tool calls.")
+    tool_fields: Optional[list[str]] = Field(default=None, description="List of relevant field paths to include from tool results, e.g. 'types[*].type.name', 'stats[*].base_stat' or 'name'.")
+    ready_to_answer: Optional[bool] = Field(default=None, description="Set instead of a final_answer once the observations, including those of this step's tool calls, are enough to answer.")
+
+class StepToolCalls:
+    """
+    The tool calls of one step. While the completion streams, each call is started as soon as its
+    arguments are a complete JSON object, so the tools run while the model is still generating.
+    """
+    def __init__(self, max_concurrency: int, tool_fields: Optional[list[str]] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.field_spec = compile_field_spec(tool_fields) if tool_fields else None
+        self.tasks: dict[int, asyncio.Future] = {}
+        self.first_started_at: Optional[float] = None
+        self.thought_shown = False
+
+    def start(self, index: int, arguments: str, call: Callable[[], Awaitable]):
+        if not self.enabled or index in self.tasks or not arguments.rstrip().endswith("}"):
+            return
+        try:
+            json.loads(arguments)
+        except ValueError:
+            return
+        if self.first_started_at is None:
+            self.first_started_at = time.perf_counter()
+        self.tasks[index] = asyncio.ensure_future(call())
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
 
 class ChatCompletionReponseWrapper(BaseModel):
     agent_response: Optional[PokemonAgentResponse] = None
-    tool_calls: List[ParsedFunctionToolCall]
+    # openai.types.chat.parsed_function_tool_call.ParsedFunctionToolCall, kept as Any so openai is only imported on first use
+    tool_calls: List[Any]
+    model: Optional[str] = None
+    # The tool calls already started while the completion was streaming
+    step_tool_calls: Optional[Any] = None
+
+# always: a separate reflection completion after every tool step
+# never: the thought is folded into the next action/answer completion
+# auto: reflect only when some tool calls of the step failed
+ReflectionPolicy = Literal["always", "never", "auto"]
+
+# step: thought and tool selection, reflection: thought after a tool step, answer: the final answer
+CompletionPhase = Literal["step", "reflection", "answer"]
+
+# Added to the messages of an answer completion only, it is not kept in the memory
+_ANSWER_INSTRUCTION = {"role": "system", "content": "Respond with the final_answer to the user's query now, unless a tool call is still needed."}
+
+# "done" is only sent once the next call starts or the completion ends, so "delta" is watched for complete arguments too
+_TOOL_ARGUMENTS_EVENTS = ("tool_calls.function.arguments.delta", "tool_calls.function.arguments.done")
 
 class PokemonAgent:
-    def __init__(self, api_key: str, tools: list[Tool], console: PokedexCLI):
-        self._llm = OpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        tools: list[Tool],
+        console: PokedexCLI,
+        max_concurrent_tool_calls: int = 8,
+        tool_call_timeout: Optional[float] = 30.0,
+        max_observation_tokens: int = 1500,
+        max_context_tokens: int = 16000,
+        reflection_policy: ReflectionPolicy = "auto",
+        tool_router: Optional[ToolRouter] = None,
+        max_memoized_tool_results: int = 256,
+        llm: Optional["AsyncOpenAI"] = None,
+        llm_rate_limiter: Optional[RateLimiter] = None,
+        step_model: str = "gpt-4o-mini",
+        answer_model: str = "gpt-4o",
+        escalate_after_failures: int = 2,
+        pipeline_tool_calls: bool = True
+    ):
+        self._api_key = api_key
+        # Sessions served by one process share a single client and its connection pool
+        self._client: Optional["AsyncOpenAI"] = llm
+        self._llm_rate_limiter = llm_rate_limiter
         self._tools: dict[str, Tool] = {tool.name : tool for tool in tools}
         self._console = console
-        self._messages = [
-            {"role": "system", "content": self._get_system_prompt()}
-        ]
+        self._max_concurrent_tool_calls = max_concurrent_tool_calls
+        self._tool_call_timeout = tool_call_timeout
+        self._max_observation_tokens = max_observation_tokens
+        self._memory = ConversationMemory(self._get_system_prompt(), max_tokens=max_context_tokens)
+        self._reflection_policy = reflection_policy
+        self._tool_router = tool_router
+        self._recent_tool_names: set[str] = set()
+        self._tool_schemas = self._select_tool_schemas(None)
+        # Results are memoized for the whole session, identical concurrent calls share one in-flight task
+        self._tool_results: OrderedDict[tuple, Any] = OrderedDict()
+        self._inflight_tool_calls: dict[tuple, asyncio.Future] = {}
+        self._max_memoized_tool_results = max_memoized_tool_results
+        # Steps and reflections run on the step model, which hands off with ready_to_answer. The answer model writes
+        # the final answer, and takes over the steps after `escalate_after_failures` failed completions or tool steps in a row.
+        self._step_model = step_model
+        self._answer_model = answer_model
+        self._escalate_after_failures = escalate_after_failures
+        self._failures = 0
+        self._pipeline_tool_calls = pipeline_tool_calls
+        # Calls, tokens and latency per phase and model, e.g. llm_usage["step"]["gpt-4o-mini"]["prompt_tokens"]
+        self.llm_usage: dict[str, dict[str, dict[str, float]]] = {}
+        self.prompt_tokens: list[int] = []
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.tool_cache_hits = 0
+        self.tool_inflight_hits = 0
+        # Per tool step: how long its tools ran, how long the step waited for them after the completion ended,
+        # and the difference, the tool time hidden behind the generation of the completion
+        self.tool_steps: list[dict[str, float]] = []
+
+    async def run(
+        self,
+        user_query: str,
+        max_steps: Optional[int] = 10,
+        on_answer_token: Optional[Callable[[str], None]] = None
+    ) -> str:
+        with tracer.span("agent.run") as span:
+            try:
+                return await self._run(user_query, max_steps, on_answer_token)
+            finally:
+                span.set(
+                    llm_calls=self.llm_calls,
+                    tool_calls=self.tool_calls,
+                    prompt_tokens=sum(self.prompt_tokens),
+                    tool_cache_hits=self.tool_cache_hits,
+                    tool_inflight_hits=self.tool_inflight_hits,
+                )
 
-    async def run(self, user_query: str, max_steps: Optional[int] = 10) -> str:
-        self._messages.append({
-            "role": "user",
-            "content": user_query
-        })
+    async def _run(
+        self,
+        user_query: str,
+        max_steps: Optional[int],
+        on_answer_token: Optional[Callable[[str], None]]
+    ) -> str:
+        self._memory.append("user", user_query, "query")
+        self.prompt_tokens = []
+        self.llm_usage = {}
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.tool_cache_hits = 0
+        self.tool_inflight_hits = 0
+        self.tool_steps = []
+        self._failures = 0
+        # The selection stays fixed for the whole query so every completion shares the same prompt prefix
+        self._tool_schemas = self._select_tool_schemas(user_query)
+        self._recent_tool_names = set()
 
+        phase: CompletionPhase = "step"
         for _ in range(max_steps):
-            response = self._get_chat_completion()
+            response = await self._get_chat_completion(phase, on_answer_token=on_answer_token)
+            phase = "step"
             if not response:
                 continue
 
             agent_response = response.agent_response
             if agent_response:
                 if agent_response.final_answer:
+                    if response.model != self._answer_model:
+                        # The step model answered instead of handing off, the answer model answers again
+                        phase = "answer"
+                        continue
                     return agent_response.final_answer
-                if agent_response.thought:
+                if agent_response.thought and not (response.step_tool_calls and response.step_tool_calls.thought_shown):
                     self._console.info(agent_response.thought, "thought")
+                if agent_response.ready_to_answer:
+                    # The step model hands off without drafting the answer, the next completion writes it.
+                    # With tool calls, that is once their observations are in.
+                    phase = "answer"
 
             tool_calls = response.tool_calls
             if tool_calls:
-                observations = await self._process_tool_calls(tool_calls)
                 tool_fields = (
                     response.agent_response.tool_fields
                     if response.agent_response and response.agent_response.tool_fields
                     else None
                 )
+                observations, failed = await self._process_tool_calls(tool_calls, tool_fields, response.step_tool_calls)
 
-                formatted_observations = self._format_observations(observations, tool_fields)
-                self._messages.append({
-                    "role": "assistant",
-                    "content": formatted_observations
-                })
+                formatted_observations = self._format_observations(observations)
+                self._memory.append("assistant", formatted_observations, "observation")
+                self._failures = self._failures + 1 if failed else 0
 
-                reflection = self._get_chat_completion()
+                if not self._should_reflect(failed):
+                    continue
+
+                reflection = await self._get_chat_completion("reflection")
                 if reflection and reflection.agent_response and reflection.agent_response.thought:
                     self._console.info(reflection.agent_response.thought, "thought")
-                    self._messages.append({
-                        "role": "assistant",
-                        "content": reflection.agent_response.thought
-                    })
+                    self._memory.append("assistant", reflection.agent_response.thought, "thought")
 
-        reponse = self._get_chat_completion()
-        if not response or not response.agent_response or not reponse.agent_response.final_answer:
+        response = await self._get_chat_completion("answer", on_answer_token=on_answer_token)
+        if not response or not response.agent_response or not response.agent_response.final_answer:
             return "Sorry, I couldn't find an answer for that."
 
-        return reponse.agent_response.final_answer
+        return response.agent_response.final_answer
     
+    def _select_tool_schemas(self, user_query: Optional[str]) -> list[dict]:
+        if self._tool_router and user_query:
+            # Tools used for the previous question stay available for follow-ups
+            selected = {tool.name for tool in self._tool_router.select(user_query)} | self._recent_tool_names
+        else:
+            selected = self._tools.keys()
+        return [self._tools[name].get_json_schema() for name in sorted(selected)]
+
+    def _should_reflect(self, failed: int) -> bool:
+        if self._reflection_policy == "always":
+            return True
+        if self._reflection_policy == "never":
+            return False
+        return failed > 0
+
+    def _select_model(self, phase: CompletionPhase) -> str:
+        if phase == "answer" or self._failures >= self._escalate_after_failures:
+            return self._answer_model
+        return self._step_model
+
+    def _record_llm_usage(self, phase: CompletionPhase, model: str, latency: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+        usage = self.llm_usage.setdefault(phase, {}).setdefault(
+            model, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0}
+        )
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["latency_ms"] = round(usage["latency_ms"] + latency * 1000, 3)
+
+    @property
+    def _llm(self) -> "AsyncOpenAI":
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key)
+        return self._client
+
     def _get_system_prompt(self) -> str:
         return dedent(f"""
         You are a Pokémon-savvy assistant. You operate in a loop with the following structure:
@@ -89,14 +269,18 @@ class PokemonAgent:
         - Provide a final answer only when you are absolutely certain.
         - You can return multiple tool calls.
         - For tool calls, include relevant fields such as types, abilities, and stats only if applicable.
+          Fields are paths into the result, use [*] for every list item, e.g. types[*].type.name, stats[*].base_stat, abilities[*].ability.name.
         - You should avoid calling all Pokémons one by one if possible, try to be smart.
+          Use the _batch tools to fetch several resources of the same kind in a single call.
         - Prefer using Pokémon IDs instead of names in tool calls whenever possible.
+          Names are resolved to IDs for you, clear misspellings included. When a name is not found, look it up with resolve_pokeapi_names.
 
         Example Session:
         1. User Question: What type is Charizard?
         2. You respond with your thought, e.g., I should fetch the type of Charizard, and the appropriate tool call(s).
         3. You will then be provided with observations based on your tool calls.
-        4. If you believe you have enough information to answer the question, respond with final_answer.
+        4. If you believe you have enough information to answer the question, respond with ready_to_answer,
+           or set it along with the last tool calls you need. You will then be asked for the final_answer.
         Otherwise, repeat the process: Thought → Action → Observation.
                                 
         Background Knowledge:
@@ -105,71 +289,268 @@ class PokemonAgent:
         - A standard Pokémon team or party is made up of six Pokémon.
         """)
 
-    def _get_chat_completion(self, max_retries: Optional[int] = 3) -> Optional[ChatCompletionReponseWrapper]:
-        tool_schemas = [tool.get_json_schema() for tool in self._tools.values()]
-        
-        for _ in range(max_retries):
-            try: 
-                completion = self._llm.chat.completions.parse(
-                    model="gpt-4o",
-                    messages=self._messages,
-                    tools=tool_schemas,
-                    response_format=type_to_response_format_param(PokemonAgentResponse)
-                )
-                message = completion.choices[0].message
-                agent_response = None
-
-
-                # https://github.com/openai/openai-python/issues/1733?utm_source=chatgpt.com
-                # I've been running into an issue where the OpenAI API occasionally returns duplicated JSON, which triggers a validation error.
-                # It seems to stem from passing both tools and the response format at the same time.
-                # I tried various things such as splitting the agent into two parts, but that severely degraded the performance.
-                # As a workaround, I ended up adding manual parsing to catch and correct any duplicated JSON before validation.
-                # I noticed that the two JSON responses were effectively identical, so I simply chose the last one.
-
-                if message.content:
-                    lines = [line for line in message.content.splitlines() if line.strip()]
-                    json = lines[-1]  
-                    agent_response = PokemonAgentResponse.model_validate_json(json)
-                return ChatCompletionReponseWrapper(agent_response=agent_response, tool_calls=message.tool_calls or [])
-            except Exception as e:
-                self._messages.append({
-                    "role": "assistant",
-                    "content": str(e)
-                })
-
-        return None  
-
-    async def _process_tool_calls(self, tool_calls: list) -> dict:
-        observations = {}
-        for tool_call in tool_calls:
-            try: 
-                tool_name = tool_call.function.name
-                tool_args = json.loads(tool_call.function.arguments)
-                tool_args_str = ",".join(str(v) for v in tool_args.values())
-                self._console.info(f"Calling {tool_name} with {tool_args_str}", "action")
-                result = await self._tools[tool_name].invoke(**tool_args)
-                observations[(tool_name, tool_args_str)] = result
-            except Exception as e:
-                self._console.info(f"Error: {e}", "error")
-                continue
+    async def _get_chat_completion(
+        self,
+        phase: CompletionPhase = "step",
+        max_retries: Optional[int] = 3,
+        on_answer_token: Optional[Callable[[str], None]] = None
+    ) -> Optional[ChatCompletionReponseWrapper]:
+        from openai.lib._parsing._completions import type_to_response_format_param
+
+        streamed_answer = ""
+
+        with tracer.span(f"llm.{phase}") as span:
+            for attempt in range(max_retries):
+                self.llm_calls += 1
+                # Retries count as failures, so a completion that keeps failing is retried on the answer model
+                model = self._select_model(phase)
+                # Answers drafted by the step model are not shown, the answer model writes them again
+                forward_answer_tokens = on_answer_token if model == self._answer_model else None
+                span.set(retries=attempt, model=model)
+                if self._llm_rate_limiter:
+                    await self._llm_rate_limiter.acquire()
+                started_at = time.perf_counter()
+                recorded = False
+                step_tool_calls: Optional[StepToolCalls] = None
+                try: 
+                    messages = self._memory.messages()
+                    if phase == "answer":
+                        messages.append(_ANSWER_INSTRUCTION)
+                    if span.recording:
+                        span.set(request_bytes=sum(len(message["content"].encode()) for message in messages))
+                    async with self._llm.chat.completions.stream(
+                        model=model,
+                        messages=messages,
+                        tools=self._tool_schemas,
+                        response_format=type_to_response_format_param(PokemonAgentResponse),
+                        stream_options={"include_usage": True}
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content.delta" and forward_answer_tokens:
+                                # Forward the final answer token by token while the rest of the JSON is still being generated
+                                partial_answer = _parse_partial_final_answer(event.snapshot)
+                                if partial_answer and partial_answer.startswith(streamed_answer) and len(partial_answer) > len(streamed_answer):
+                                    forward_answer_tokens(partial_answer[len(streamed_answer):])
+                                    streamed_answer = partial_answer
+                            elif event.type in _TOOL_ARGUMENTS_EVENTS and phase == "step" and self._pipeline_tool_calls:
+                                if step_tool_calls is None:
+                                    step_tool_calls = self._start_step_tool_calls(stream.current_completion_snapshot)
+                                step_tool_calls.start(
+                                    event.index,
+                                    event.arguments,
+                                    functools.partial(self._process_tool_call, event.name, event.arguments, step_tool_calls),
+                                )
+                        completion = await stream.get_final_completion()
 
-        return observations
+                    self.prompt_tokens.append(
+                        completion.usage.prompt_tokens if completion.usage else self._memory.total_tokens
+                    )
+                    completion_tokens = completion.usage.completion_tokens if completion.usage else 0
+                    self._record_llm_usage(
+                        phase, model, time.perf_counter() - started_at, self.prompt_tokens[-1], completion_tokens
+                    )
+                    recorded = True
 
-    def _format_observations(self, observations: dict, tool_fields: Optional[list[str]]=None):
+                    message = completion.choices[0].message
+                    agent_response = None
+                    if span.recording:
+                        span.set(
+                            prompt_tokens=self.prompt_tokens[-1],
+                            completion_tokens=completion_tokens,
+                            response_bytes=len((message.content or "").encode()),
+                            tool_call_count=len(message.tool_calls or []),
+                        )
+
+                    if message.content:
+                        agent_response = _parse_agent_response(message.content)
+                    return ChatCompletionReponseWrapper(
+                        agent_response=agent_response,
+                        tool_calls=message.tool_calls or [],
+                        model=model,
+                        step_tool_calls=step_tool_calls if step_tool_calls is not None and step_tool_calls.enabled else None,
+                    )
+                except asyncio.CancelledError:
+                    if step_tool_calls is not None:
+                        step_tool_calls.cancel()
+                    raise
+                except Exception as e:
+                    if step_tool_calls is not None:
+                        step_tool_calls.cancel()
+                    self._failures += 1
+                    if not recorded:
+                        self._record_llm_usage(phase, model, time.perf_counter() - started_at)
+                    self._memory.append("assistant", str(e), "error")
+
+            return None  
+
+    def _start_step_tool_calls(self, snapshot) -> StepToolCalls:
+        """
+        Called when the first tool call streams in, after the content: its tool_fields are needed to start the calls.
+        Nothing is started early when the content cannot be parsed or is a final answer, the tool calls then wait
+        for the end of the completion as before.
+        """
+        try:
+            agent_response = _parse_agent_response(snapshot.choices[0].message.content or "")
+        except ValueError:
+            return StepToolCalls(self._max_concurrent_tool_calls, enabled=False)
+        if agent_response.final_answer:
+            return StepToolCalls(self._max_concurrent_tool_calls, enabled=False)
+
+        step_tool_calls = StepToolCalls(self._max_concurrent_tool_calls, agent_response.tool_fields)
+        if agent_response.thought:
+            # Shown now so the trace lists it before the tool calls it led to
+            self._console.info(agent_response.thought, "thought")
+            step_tool_calls.thought_shown = True
+        return step_tool_calls
+
+    async def _process_tool_calls(
+        self,
+        tool_calls: list,
+        tool_fields: Optional[list[str]] = None,
+        step_tool_calls: Optional[StepToolCalls] = None
+    ) -> tuple[dict, int]:
+        """
+        The observations of a step, keyed by tool and arguments, and the number of calls that failed.
+        Identical calls share one observation, so the failures are counted from the results, not the keys.
+        """
+        # All calls of a step run concurrently. If the step is abandoned (e.g. run() is cancelled),
+        # gather cancels every sibling that is still in flight.
+        step_tool_calls = step_tool_calls or StepToolCalls(self._max_concurrent_tool_calls, tool_fields)
+        started_at = time.perf_counter()
+        with tracer.span("agent.tool_calls", calls=len(tool_calls)) as span:
+            results = await asyncio.gather(*[
+                step_tool_calls.tasks.get(index)
+                or self._process_tool_call(tool_call.function.name, tool_call.function.arguments, step_tool_calls)
+                for index, tool_call in enumerate(tool_calls)
+            ])
+            finished_at = time.perf_counter()
+            # Tools started early ran alongside the generation, the step only waited for the part after it
+            tools_ms = (finished_at - (step_tool_calls.first_started_at or started_at)) * 1000
+            waited_ms = (finished_at - started_at) * 1000
+            tool_step = {
+                "calls": len(tool_calls),
+                "pipelined": len(step_tool_calls.tasks),
+                "tools_ms": round(tools_ms, 3),
+                "waited_ms": round(waited_ms, 3),
+                "overlap_ms": round(tools_ms - waited_ms, 3),
+            }
+            self.tool_steps.append(tool_step)
+            span.set(**{key: value for key, value in tool_step.items() if key != "calls"})
+
+            observations = {}
+            failed = 0
+            for result in results:
+                if result is None:
+                    failed += 1
+                    continue
+                key, value = result
+                observations[key] = value
+
+            span.set(failed=failed)
+            return observations, failed
+
+    async def _process_tool_call(self, tool_name: str, arguments: str, step_tool_calls: StepToolCalls) -> Optional[tuple]:
+        try: 
+            tool_args = json.loads(arguments)
+            # Argument order is irrelevant to the result, so it must not be part of the key
+            tool_args_str = ",".join(str(v) for _, v in sorted(tool_args.items()))
+            key = (tool_name, json.dumps(tool_args, sort_keys=True))
+            tool = self._tools[tool_name]
+            self.tool_calls += 1
+
+            # The unprojected results are memoized, so a later step asking for other fields of the same
+            # resource is a hit too. For a PokeAPI resource that is its response body, only the fields
+            # of each step are decoded from it.
+            if key in self._tool_results:
+                self.tool_cache_hits += 1
+                tracer.current().add("memo_hits")
+                self._tool_results.move_to_end(key)
+                self._console.info(f"Calling {tool_name} with {tool_args_str} (cached)", "action")
+                return (tool_name, tool_args_str), tool.project_result(self._tool_results[key], step_tool_calls.field_spec)
+
+            task = self._inflight_tool_calls.get(key)
+            if task is not None:
+                self.tool_inflight_hits += 1
+                tracer.current().add("inflight_hits")
+                self._console.info(f"Calling {tool_name} with {tool_args_str} (shared)", "action")
+                return (tool_name, tool_args_str), tool.project_result(await task, step_tool_calls.field_spec)
+
+            task = asyncio.ensure_future(self._invoke_tool(tool_name, tool_args, tool_args_str, step_tool_calls.semaphore))
+            self._inflight_tool_calls[key] = task
+            try:
+                result = await task
+            finally:
+                self._inflight_tool_calls.pop(key, None)
+
+            if tool.is_cacheable(result):
+                self._tool_results[key] = result
+                if len(self._tool_results) > self._max_memoized_tool_results:
+                    self._tool_results.popitem(last=False)
+            self._recent_tool_names.add(tool_name)
+            return (tool_name, tool_args_str), tool.project_result(result, step_tool_calls.field_spec)
+        except ToolUnavailableError as e:
+            # Not a failure of the step: the model is told what to use instead, and the call is retried next time
+            self._console.info(f"{tool_name} is not available yet", "error")
+            return (tool_name, tool_args_str), str(e)
+        except asyncio.TimeoutError:
+            tracer.current().add("timeouts")
+            self._console.info(f"Error: {tool_name} timed out after {self._tool_timeout(tool_name)}s", "error")
+        except Exception as e:
+            self._console.info(f"Error: {e}", "error")
+
+        return None
+
+    async def _invoke_tool(
+        self,
+        tool_name: str,
+        tool_args: dict,
+        tool_args_str: str,
+        semaphore: asyncio.Semaphore
+    ):
+        tool = self._tools[tool_name]
+        async with semaphore:
+            self._console.info(f"Calling {tool_name} with {tool_args_str}", "action")
+            return await asyncio.wait_for(tool.fetch(**tool_args), timeout=self._tool_timeout(tool_name))
+
+    def _tool_timeout(self, tool_name: str) -> Optional[float]:
+        timeout = self._tools[tool_name].timeout
+        return timeout if timeout is not None else self._tool_call_timeout
+
+    def _format_observations(self, observations: dict):
         formatted_observations = []
         for (tool_name, tool_args), result in observations.items():
-            # Include only the relevant information when tool_fields are specified
-            if isinstance(result, dict) and tool_fields:
-                updated_result = {}
-                for tool_field in tool_fields:
-                    updated_result[tool_field] = result.get(tool_field, "")
-                result = updated_result
+            # Results are already limited to the step's tool_fields by the tools
+            if isinstance(result, (dict, list, Record)):
+                # The model uses names and IDs, a link only matters when it is all there is (e.g. evolution_chain)
+                result = json.dumps(drop_redundant_urls(to_builtin(result)), separators=(",", ":"), ensure_ascii=False)
 
             observation = [
                 f"Tool used: {tool_name}",
                 f"Tool args: {tool_args}",
-                f"Result: {result}"
+                f"Result: {truncate_to_tokens(str(result), self._max_observation_tokens)}"
             ]
             formatted_observations.append("\n".join(observation))
-        return "\n".join(formatted_observations)
\ No newline at end of file
+        return "\n".join(formatted_observations)
+
+def _parse_agent_response(content: str) -> PokemonAgentResponse:
+    # https://github.com/openai/openai-python/issues/1733?utm_source=chatgpt.com
+    # I've been running into an issue where the OpenAI API occasionally returns duplicated JSON, which triggers a validation error.
+    # It seems to stem from passing both tools and the response format at the same time.
+    # I tried various things such as splitting the agent into two parts, but that severely degraded the performance.
+    # As a workaround, I ended up adding manual parsing to catch and correct any duplicated JSON before validation.
+    # I noticed that the two JSON responses were effectively identical, so I simply chose the last one.
+    lines = [line for line in content.splitlines() if line.strip()]
+    return PokemonAgentResponse.model_validate_json(lines[-1] if lines else content)
+
+def _parse_partial_final_answer(snapshot: str) -> Optional[str]:
+    from jiter import from_json
+
+    # Same duplicated JSON workaround as in _get_chat_completion: only look at the last line
+    lines = [line for line in snapshot.splitlines() if line.strip()]
+    if not lines:
+        return None
+    try:
+        partial = from_json(lines[-1].encode(), partial_mode="trailing-strings")
+    except ValueError:
+        return None
+    return partial.get("final_answer") if isinstance(partial, dict) else None
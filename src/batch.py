@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Iterable, Optional, TextIO
+
+from rate_limit import RateLimiter
+from runtime import PokedexRuntime
+
+class NullConsole:
+    def info(self, message: str, style: Optional[str] = None):
+        pass
+
+    def bot(self, message: str):
+        pass
+
+def read_queries(lines: Iterable[str]) -> list[dict[str, Any]]:
+    """Accepts JSONL objects with a `query` field (and an optional `id`), or plain text, one query per line."""
+    queries = []
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = line
+        if not isinstance(item, dict):
+            item = {"query": str(item)}
+        item.setdefault("id", index)
+        queries.append(item)
+    return queries
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+async def run_batch(
+    runtime: PokedexRuntime,
+    queries: list[dict[str, Any]],
+    output: TextIO,
+    concurrency: int = 16,
+    llm_requests_per_minute: Optional[float] = None,
+    max_steps: int = 10,
+) -> dict[str, Any]:
+    """Runs every query in its own agent session and writes one JSON line per result as soon as it finishes."""
+    semaphore = asyncio.Semaphore(concurrency)
+    rate_limiter = RateLimiter(llm_requests_per_minute) if llm_requests_per_minute else None
+    latencies: list[float] = []
+    errors = 0
+
+    def write(result: dict[str, Any]):
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+
+    async def run_one(item: dict[str, Any]):
+        nonlocal errors
+        result = {"id": item.get("id"), "query": item.get("query")}
+        if not isinstance(result["query"], str) or not result["query"].strip():
+            # Reported in place, a malformed line must not abort the rest of the batch
+            result["error"] = "Missing query"
+            errors += 1
+            write(result)
+            return
+
+        async with semaphore:
+            agent = runtime.create_agent(NullConsole(), llm_rate_limiter=rate_limiter)
+            started_at = time.perf_counter()
+            try:
+                result["answer"] = await agent.run(item["query"], max_steps=max_steps)
+            except Exception as e:
+                result["error"] = str(e)
+                errors += 1
+            latency = time.perf_counter() - started_at
+            latencies.append(latency)
+
+        result.update({
+            "latency": round(latency, 3),
+            "llm_calls": agent.llm_calls,
+            "prompt_tokens": sum(agent.prompt_tokens),
+            "llm_usage": agent.llm_usage,
+            "tool_steps": agent.tool_steps,
+            "tool_calls": agent.tool_calls,
+            "tool_cache_hits": agent.tool_cache_hits,
+        })
+        write(result)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[run_one(item) for item in queries])
+    elapsed = time.perf_counter() - started_at
+
+    return {
+        "queries": len(queries),
+        "errors": errors,
+        "elapsed": round(elapsed, 3),
+        "throughput_per_second": round(len(queries) / elapsed, 3) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 0.5), 3),
+        "latency_p95": round(percentile(latencies, 0.95), 3),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run many Pokédex queries through independent agent sessions.")
+    parser.add_argument("--input", "-i", default="-", help="JSONL or plain text file with one query per line, - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="JSONL file to append results to, - for stdout")
+    parser.add_argument("--concurrency", "-c", type=int, default=16, help="Maximum number of queries running at once")
+    parser.add_argument("--rpm", type=float, default=None, help="Maximum LLM requests per minute across all queries")
+    parser.add_argument("--max-steps", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.input == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.input) as f:
+            queries = read_queries(f)
+
+    runtime = PokedexRuntime()
+    output = sys.stdout if args.output == "-" else open(args.output, "a")
+    try:
+        summary = await run_batch(runtime, queries, output, args.concurrency, args.rpm, args.max_steps)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        await runtime.aclose()
+
+    print(json.dumps(summary), file=sys.stderr)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,12 @@
 from typing import Literal, Optional
-from rich.console import Console
-from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.theme import Theme
+
+SPAN_SUMMARY_COLUMNS = {"count", "errors", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms"}
 
 class PokedexCLI:
     def __init__(self):
+        from rich.console import Console
+        from rich.theme import Theme
+
         custom_theme = Theme({
             "thought": "green",
             "action": "yellow",
@@ -20,10 +21,87 @@ class PokedexCLI:
         )
 
     def bot(self, message: str):
+        from rich.panel import Panel
+
         self._console.print(Panel(
             f"[answer]{message}[/answer]",
             expand=False,
         ))
     
+    def stats(self, stats: dict):
+        from rich.table import Table
+
+        spans = stats.get("spans")
+        if spans:
+            table = Table(title="Spans")
+            table.add_column("Span")
+            for column in ("Count", "Errors", "Mean ms", "p95 ms", "Max ms"):
+                table.add_column(column, justify="right")
+            table.add_column("Totals")
+            for name, summary in spans.items():
+                totals = {key: value for key, value in summary.items() if key not in SPAN_SUMMARY_COLUMNS}
+                table.add_row(
+                    name,
+                    str(summary["count"]),
+                    str(summary["errors"]),
+                    f"{summary['mean_ms']:.1f}",
+                    f"{summary['p95_ms']:.1f}",
+                    f"{summary['max_ms']:.1f}",
+                    ", ".join(f"{key}={value}" for key, value in totals.items()),
+                )
+            self._console.print(table)
+        else:
+            self.info("No spans recorded, tracing is off or nothing ran yet")
+
+        for name, values in stats.items():
+            if name != "spans":
+                self.info(f"{name}: {values}")
+
+    def bot_stream(self) -> "BotStream":
+        return BotStream(self._console)
+    
     def ask_user(self):
-        return Prompt.ask("You")
\ No newline at end of file
+        from rich.prompt import Prompt
+
+        return Prompt.ask("You")
+
+class BotStream:
+    """Renders the bot's answer panel incrementally as tokens arrive."""
+    def __init__(self, console):
+        self._console = console
+        self._text = ""
+        self._live = None
+
+    def write(self, token: str):
+        from rich.live import Live
+
+        self._text += token
+        if self._live is None:
+            self._live = Live(self._render(), console=self._console, refresh_per_second=15)
+            self._live.start()
+        else:
+            self._live.update(self._render())
+
+    def finish(self, message: Optional[str] = None):
+        if message is not None:
+            self._text = message
+        if self._live is None:
+            self._console.print(self._render())
+            return
+        self._live.update(self._render(), refresh=True)
+        self._live.stop()
+        self._live = None
+
+    def _render(self):
+        from rich.panel import Panel
+        from rich.text import Text
+
+        return Panel(Text(self._text, style="answer"), expand=False)
+
+    def __enter__(self) -> "BotStream":
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
@@ -1,41 +1,62 @@
 import asyncio
-import os
-from dotenv import load_dotenv
 
-from agent import PokemonAgent
 from cli import PokedexCLI
-from tools.pokeapi import get_poke_api_tools
-from tools.pokemon_types import get_effectiveness_multiplier
-from tools.smogon import get_most_used_pokemons
-from tools.tool import FnTool
-
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+from runtime import PokedexRuntime
 
 async def run_agent():
     console = PokedexCLI()
+    runtime = PokedexRuntime()
+    runtime.start_background_tasks()
+    agent = runtime.create_agent(console)
 
-    tools = [
-        FnTool(get_effectiveness_multiplier),
-        FnTool(get_most_used_pokemons),
-    ] + get_poke_api_tools()
-
-    agent = PokemonAgent(OPENAI_API_KEY, tools, console)
-
-    console.bot("🔍 Welcome to the Pokédex!\nType 'exit' or 'quit' to leave")
+    console.bot("🔍 Welcome to the Pokédex!\nType 'exit' or 'quit' to leave, '/stats' to see where the time went")
     console.info("🟡 Yellow: Pokédex is fetching data\n🟢 Green: Pokédex's internal thought")
 
-    while True:
-        user_query = console.ask_user()
-        if user_query.strip().lower() in ("exit", "quit"):
-            console.bot("Goodbye! 👋")
-            break
-        try:
-            answer = await agent.run(user_query)
-            console.bot(answer)
-        except Exception as e:
-            console.info(f"Error: {e}", "error")
+    try:
+        while True:
+            user_query = await asyncio.to_thread(console.ask_user)
+            if user_query.strip().lower() in ("exit", "quit"):
+                console.bot("Goodbye! 👋")
+                break
+            if user_query.strip().lower() == "/stats":
+                console.stats(runtime.stats())
+                continue
+            try:
+                with console.bot_stream() as stream:
+                    answer = await agent.run(user_query, on_answer_token=stream.write)
+                    stream.finish(answer)
+                console.info(
+                    f"LLM calls: {agent.llm_calls}, "
+                    f"prompt tokens per request: {', '.join(map(str, agent.prompt_tokens))}, "
+                    f"tool calls: {agent.tool_calls} "
+                    f"({agent.tool_cache_hits} cached, {agent.tool_inflight_hits} shared in flight)"
+                )
+                if agent.tool_steps:
+                    console.info("Tool steps: " + "; ".join(
+                        f"{step['pipelined']}/{step['calls']} calls started while streaming, "
+                        f"tools ran {step['tools_ms']:.0f} ms, {step['overlap_ms']:.0f} ms of it during the completion"
+                        for step in agent.tool_steps
+                    ))
+                console.info("LLM usage: " + "; ".join(
+                    f"{phase} on {model}: {usage['calls']} calls, {usage['prompt_tokens']} prompt tokens, "
+                    f"{usage['completion_tokens']} completion tokens, {usage['latency_ms']:.0f} ms"
+                    for phase, models in agent.llm_usage.items()
+                    for model, usage in models.items()
+                ))
+            except Exception as e:
+                console.info(f"Error: {e}", "error")
+    finally:
+        console.info(f"HTTP pool: {runtime.http_client.stats()}")
+        console.info(f"Response cache: {runtime.response_cache.stats()}")
+        await runtime.aclose()
+
+def __getattr__(name: str):
+    # `uvicorn src.main:application` resolves the ASGI app lazily, so the CLI never imports FastAPI
+    if name == "application":
+        from server import create_application
+        globals()["application"] = create_application()
+        return globals()["application"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    asyncio.run(run_agent())
\ No newline at end of file
+    asyncio.run(run_agent())
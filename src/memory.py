@@ -0,0 +1,94 @@
+from typing import Literal, Optional
+
+from tokens import estimate_tokens, truncate_to_tokens
+
+MessageKind = Literal["system", "query", "thought", "observation", "error"]
+
+class ConversationMemory:
+    """
+    Token-budgeted message history for PokemonAgent.
+
+    The system prompt, the latest user query and the most recent messages are pinned.
+    Once the history exceeds `max_tokens`, older observations are first compacted to a
+    short excerpt, then the oldest unpinned messages are evicted, errors first.
+    """
+    def __init__(
+        self,
+        system_prompt: str,
+        max_tokens: int = 16000,
+        pinned_recent_messages: int = 6,
+        compacted_observation_tokens: int = 60,
+    ):
+        self.max_tokens = max_tokens
+        self._pinned_recent_messages = pinned_recent_messages
+        self._compacted_observation_tokens = compacted_observation_tokens
+        self._entries: list[dict] = []
+        self.total_tokens = 0
+        self.compacted = 0
+        self.evicted = 0
+        self.append("system", system_prompt, "system")
+
+    def append(self, role: str, content: str, kind: MessageKind):
+        tokens = estimate_tokens(content)
+        self._entries.append({"role": role, "content": content, "kind": kind, "tokens": tokens, "compacted": False})
+        self.total_tokens += tokens
+        self._enforce_budget()
+
+    def messages(self) -> list[dict[str, str]]:
+        return [{"role": entry["role"], "content": entry["content"]} for entry in self._entries]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "messages": len(self._entries),
+            "tokens": self.total_tokens,
+            "max_tokens": self.max_tokens,
+            "compacted": self.compacted,
+            "evicted": self.evicted,
+        }
+
+    def _evictable(self) -> list[int]:
+        last_query = max(
+            (index for index, entry in enumerate(self._entries) if entry["kind"] == "query"),
+            default=None
+        )
+        recent_start = len(self._entries) - self._pinned_recent_messages
+        return [
+            index for index, entry in enumerate(self._entries)
+            if entry["kind"] != "system" and index != last_query and index < recent_start
+        ]
+
+    def _enforce_budget(self):
+        while self.total_tokens > self.max_tokens:
+            evictable = self._evictable()
+            if not evictable:
+                return
+
+            index = self._next_observation_to_compact(evictable)
+            if index is not None:
+                self._compact(index)
+                continue
+
+            errors = [index for index in evictable if self._entries[index]["kind"] == "error"]
+            entry = self._entries.pop(errors[0] if errors else evictable[0])
+            self.total_tokens -= entry["tokens"]
+            self.evicted += 1
+
+    def _next_observation_to_compact(self, evictable: list[int]) -> Optional[int]:
+        return next(
+            (
+                index for index in evictable
+                if self._entries[index]["kind"] == "observation"
+                and not self._entries[index]["compacted"]
+                and self._entries[index]["tokens"] > self._compacted_observation_tokens
+            ),
+            None
+        )
+
+    def _compact(self, index: int):
+        entry = self._entries[index]
+        entry["content"] = truncate_to_tokens(entry["content"], self._compacted_observation_tokens)
+        tokens = estimate_tokens(entry["content"])
+        self.total_tokens += tokens - entry["tokens"]
+        entry["tokens"] = tokens
+        entry["compacted"] = True
+        self.compacted += 1
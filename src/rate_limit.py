@@ -0,0 +1,23 @@
+import asyncio
+import time
+from typing import Optional
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per `per` seconds, with bursts of up to `burst`."""
+    def __init__(self, rate: float, per: float = 60.0, burst: Optional[int] = None):
+        self._rate = rate / per
+        self._capacity = burst if burst is not None else max(1, int(rate / per))
+        self._tokens = float(self._capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
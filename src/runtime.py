@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from agent import PokemonAgent
+from tools.cache import ResponseCache
+from tools.http_client import HttpClient
+from tools.name_index import build_name_index, get_name_index, resolve_pokeapi_names
+from tools.pokeapi import get_poke_api_tools, refresh_poke_api_tools
+from tools.pokedex_dataset import build_pokedex_dataset, get_pokedex_dataset, query_pokedex
+from tools.pokemon_types import (
+    get_attackers_against_defender,
+    get_effectiveness_multiplier,
+    get_matchups_against_defenders,
+    get_team_type_analysis,
+)
+from tools.prefetch import Prefetcher
+from tools.router import ToolRouter
+from tools.smogon import SmogonStats
+from tools.team_builder import TeamBuilder
+from tools.tool import FnTool
+from tracing import tracer
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '10'))
+HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'false').lower() == 'true'
+MAX_CONCURRENT_TOOL_CALLS = int(os.getenv('MAX_CONCURRENT_TOOL_CALLS', '8'))
+TOOL_CALL_TIMEOUT = float(os.getenv('TOOL_CALL_TIMEOUT', '30'))
+TOOL_EXECUTOR = os.getenv('TOOL_EXECUTOR', 'thread')
+TOOL_EXECUTOR_WORKERS = int(os.getenv('TOOL_EXECUTOR_WORKERS', '4'))
+TEAM_SEARCH_WORKERS = int(os.getenv('TEAM_SEARCH_WORKERS', str(min(4, os.cpu_count() or 1))))
+MAX_CONTEXT_TOKENS = int(os.getenv('MAX_CONTEXT_TOKENS', '16000'))
+REFLECTION_POLICY = os.getenv('REFLECTION_POLICY', 'auto')
+STEP_MODEL = os.getenv('STEP_MODEL', 'gpt-4o-mini')
+ANSWER_MODEL = os.getenv('ANSWER_MODEL', 'gpt-4o')
+ESCALATE_AFTER_FAILURES = int(os.getenv('ESCALATE_AFTER_FAILURES', '2'))
+PIPELINE_TOOL_CALLS = os.getenv('PIPELINE_TOOL_CALLS', 'true').lower() == 'true'
+TOOL_ROUTER_TOP_K = int(os.getenv('TOOL_ROUTER_TOP_K', '12'))
+PINNED_POKE_API_PATHS = {"/api/v2/pokemon/{id}/", "/api/v2/pokemon-species/{id}/"}
+MAX_OBSERVATION_TOKENS = int(os.getenv('MAX_OBSERVATION_TOKENS', '1500'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', str(7 * 24 * 3600)))
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', '1'))
+PREFETCH_MAX_CONCURRENCY = int(os.getenv('PREFETCH_MAX_CONCURRENCY', '2'))
+PREFETCH_MAX_BYTES_PER_MINUTE = int(os.getenv('PREFETCH_MAX_BYTES_PER_MINUTE', str(4 * 1024 * 1024)))
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+OTLP_TRACES_ENDPOINT = os.getenv('OTEL_EXPORTER_OTLP_TRACES_ENDPOINT')
+TRACE_EXPORT_INTERVAL = float(os.getenv('TRACE_EXPORT_INTERVAL', '30'))
+
+tracer.enabled = TRACING_ENABLED
+
+async def refresh_tools_in_background(http_client: HttpClient):
+    # The compiled artifact is still usable if the refresh fails, so errors are ignored.
+    with contextlib.suppress(httpx.HTTPError, ValueError):
+        await refresh_poke_api_tools(http_client)
+
+async def build_dataset_in_background(http_client: HttpClient, response_cache: ResponseCache):
+    # query_pokedex tells the model to fall back to the PokeAPI tools until the build finishes.
+    with contextlib.suppress(httpx.HTTPError, KeyError, ValueError):
+        await build_pokedex_dataset(http_client, response_cache)
+
+async def build_name_index_in_background(http_client: HttpClient, response_cache: ResponseCache):
+    # Until the index is built, names are passed to PokeAPI as the model wrote them.
+    with contextlib.suppress(httpx.HTTPError, KeyError, ValueError):
+        await build_name_index(http_client, response_cache)
+
+async def export_traces(http_client: HttpClient, endpoint: str):
+    spans = tracer.take_unexported()
+    if spans:
+        # Losing a batch of spans is better than failing the request that happened to trigger the export
+        with contextlib.suppress(httpx.HTTPError):
+            await http_client.request("POST", endpoint, json=tracer.to_otlp(spans))
+
+async def export_traces_forever(http_client: HttpClient, endpoint: str, interval: float = TRACE_EXPORT_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        await export_traces(http_client, endpoint)
+
+def create_tool_executor(kind: str = TOOL_EXECUTOR, workers: int = TOOL_EXECUTOR_WORKERS) -> Executor:
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool")
+
+class PokedexRuntime:
+    """
+    Everything that is shared by all agent sessions of a process: the pooled HTTP
+    client, the response cache, the tool registry and router, and the LLM client.
+    """
+    def __init__(
+        self,
+        http_transport: Optional[httpx.AsyncBaseTransport] = None,
+        llm: Optional["AsyncOpenAI"] = None,
+    ):
+        # http_transport and llm let tests and benchmarks point the runtime at local stand-ins
+        self.http_client = HttpClient(
+            max_connections_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+            http2=HTTP2_ENABLED,
+            transport=http_transport,
+        )
+        self.response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL)
+        self.smogon_stats = SmogonStats(self.http_client)
+
+        self.tool_executor = create_tool_executor()
+        # The team search is CPU bound pure Python, only processes run its subtrees in parallel
+        self.search_executor = create_tool_executor("process", TEAM_SEARCH_WORKERS) if TEAM_SEARCH_WORKERS > 1 else None
+        self.team_builder = TeamBuilder(self.smogon_stats, self.search_executor, TEAM_SEARCH_WORKERS)
+
+        # The type tools are table lookups, handing them to a worker would cost more than running them
+        local_tools = [
+            FnTool(get_effectiveness_multiplier, inline=True),
+            FnTool(get_matchups_against_defenders, inline=True),
+            FnTool(get_attackers_against_defender, inline=True),
+            FnTool(get_team_type_analysis, inline=True),
+            FnTool(self.smogon_stats.get_most_used_pokemons),
+            FnTool(self.smogon_stats.get_pokemon_usage),
+            FnTool(self.smogon_stats.get_usage_changes),
+            FnTool(query_pokedex, executor=self.tool_executor),
+        ]
+        # Not pinned, only some queries need them: the team optimizer is for team building questions,
+        # and the PokeAPI tools resolve names on their own
+        routed_local_tools = [
+            FnTool(self.team_builder.find_coverage_team),
+            FnTool(resolve_pokeapi_names, inline=True),
+        ]
+        # PREFETCH_DEPTH=0 turns speculative prefetching off
+        self.prefetcher = Prefetcher(
+            self.http_client,
+            self.response_cache,
+            max_depth=PREFETCH_DEPTH,
+            max_concurrency=PREFETCH_MAX_CONCURRENCY,
+            max_bytes_per_minute=PREFETCH_MAX_BYTES_PER_MINUTE,
+        ) if PREFETCH_DEPTH > 0 else None
+        poke_api_tools = get_poke_api_tools(self.http_client, self.response_cache, prefetcher=self.prefetcher)
+        self.tools = local_tools + routed_local_tools + poke_api_tools
+        # The local tools and the core Pokémon endpoints are always offered, the other PokeAPI endpoints are routed per query
+        self.tool_router = ToolRouter(
+            self.tools,
+            top_k=TOOL_ROUTER_TOP_K,
+            pinned=[tool.name for tool in local_tools] + [
+                tool.name for tool in poke_api_tools if tool.path in PINNED_POKE_API_PATHS
+            ],
+        )
+        self._llm = llm
+        self._background_tasks: list[asyncio.Task] = []
+
+    def start_background_tasks(self):
+        self._background_tasks.append(asyncio.create_task(refresh_tools_in_background(self.http_client)))
+        if get_pokedex_dataset() is None:
+            self._background_tasks.append(
+                asyncio.create_task(build_dataset_in_background(self.http_client, self.response_cache))
+            )
+        if get_name_index() is None:
+            self._background_tasks.append(
+                asyncio.create_task(build_name_index_in_background(self.http_client, self.response_cache))
+            )
+        if tracer.enabled and OTLP_TRACES_ENDPOINT:
+            self._background_tasks.append(
+                asyncio.create_task(export_traces_forever(self.http_client, OTLP_TRACES_ENDPOINT))
+            )
+
+    def create_agent(self, console, **options) -> PokemonAgent:
+        if self._llm is None:
+            from openai import AsyncOpenAI
+            self._llm = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+        # Options passed by the caller override the settings from the environment
+        settings = dict(
+            max_concurrent_tool_calls=MAX_CONCURRENT_TOOL_CALLS,
+            tool_call_timeout=TOOL_CALL_TIMEOUT,
+            max_observation_tokens=MAX_OBSERVATION_TOKENS,
+            max_context_tokens=MAX_CONTEXT_TOKENS,
+            reflection_policy=REFLECTION_POLICY,
+            step_model=STEP_MODEL,
+            answer_model=ANSWER_MODEL,
+            escalate_after_failures=ESCALATE_AFTER_FAILURES,
+            pipeline_tool_calls=PIPELINE_TOOL_CALLS,
+            tool_router=self.tool_router,
+            llm=self._llm,
+        )
+        return PokemonAgent(OPENAI_API_KEY, self.tools, console, **{**settings, **options})
+
+    def stats(self) -> dict:
+        stats = {
+            "http_pool": self.http_client.stats(),
+            "response_cache": self.response_cache.stats(),
+            "spans": tracer.summary(),
+        }
+        if self.prefetcher:
+            stats["prefetch"] = self.prefetcher.stats()
+        return stats
+
+    async def aclose(self):
+        for task in self._background_tasks:
+            task.cancel()
+        if self.prefetcher:
+            await self.prefetcher.aclose()
+        if tracer.enabled and OTLP_TRACES_ENDPOINT:
+            await export_traces(self.http_client, OTLP_TRACES_ENDPOINT)
+        if tracer.enabled and TRACE_EXPORT_PATH:
+            tracer.write_otlp_json(TRACE_EXPORT_PATH)
+        await self.http_client.aclose()
+        self.tool_executor.shutdown(wait=False, cancel_futures=True)
+        if self.search_executor:
+            self.search_executor.shutdown(wait=False, cancel_futures=True)
+        if self._llm is not None:
+            await self._llm.close()
+        self.response_cache.close()
@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from agent import PokemonAgent
+from runtime import PokedexRuntime
+
+SESSION_IDLE_TIMEOUT = float(os.getenv('SESSION_IDLE_TIMEOUT', '1800'))
+SESSION_EVICTION_INTERVAL = float(os.getenv('SESSION_EVICTION_INTERVAL', '60'))
+MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '1000'))
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+class ChatResponse(BaseModel):
+    session_id: str
+    answer: str
+
+class SessionConsole:
+    """Stand-in for PokedexCLI that forwards the agent's trace to whichever request is using the session."""
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+
+    def info(self, message: str, style: Optional[str] = None):
+        if self.queue is not None:
+            self.queue.put_nowait((style or "info", message))
+
+    def bot(self, message: str):
+        if self.queue is not None:
+            self.queue.put_nowait(("answer", message))
+
+class Session:
+    def __init__(self, session_id: str, agent: PokemonAgent, console: SessionConsole):
+        self.id = session_id
+        self.agent = agent
+        self.console = console
+        # A conversation is sequential, concurrent requests to the same session wait for their turn
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+class SessionManager:
+    def __init__(self, runtime: PokedexRuntime, idle_timeout: float = SESSION_IDLE_TIMEOUT, max_sessions: int = MAX_SESSIONS):
+        self._runtime = runtime
+        self._idle_timeout = idle_timeout
+        self._max_sessions = max_sessions
+        self._sessions: dict[str, Session] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_or_create(self, session_id: Optional[str]) -> Session:
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None:
+            session.touch()
+            return session
+
+        if len(self._sessions) >= self._max_sessions and not self._evict_least_recently_used():
+            raise HTTPException(status_code=503, detail="Too many active sessions")
+
+        console = SessionConsole()
+        session = Session(session_id or uuid.uuid4().hex, self._runtime.create_agent(console), console)
+        self._sessions[session.id] = session
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> int:
+        deadline = time.monotonic() - self._idle_timeout
+        idle = [
+            session_id for session_id, session in self._sessions.items()
+            if session.last_used < deadline and not session.lock.locked()
+        ]
+        for session_id in idle:
+            del self._sessions[session_id]
+        return len(idle)
+
+    async def evict_idle_forever(self, interval: float = SESSION_EVICTION_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def _evict_least_recently_used(self) -> bool:
+        candidates = [session for session in self._sessions.values() if not session.lock.locked()]
+        if not candidates:
+            return False
+        del self._sessions[min(candidates, key=lambda session: session.last_used).id]
+        return True
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def create_application(runtime_factory: Callable[[], PokedexRuntime] = PokedexRuntime) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        runtime = runtime_factory()
+        runtime.start_background_tasks()
+        sessions = SessionManager(runtime)
+        eviction_task = asyncio.create_task(sessions.evict_idle_forever())
+        app.state.runtime = runtime
+        app.state.sessions = sessions
+        try:
+            yield
+        finally:
+            eviction_task.cancel()
+            await runtime.aclose()
+
+    app = FastAPI(title="Pokédex", lifespan=lifespan)
+
+    @app.get("/health")
+    async def health(request: Request):
+        return {"status": "ok", "sessions": len(request.app.state.sessions)}
+
+    @app.post("/chat", response_model=ChatResponse)
+    async def chat(chat_request: ChatRequest, request: Request):
+        session = request.app.state.sessions.get_or_create(chat_request.session_id)
+        async with session.lock:
+            try:
+                answer = await session.agent.run(chat_request.message)
+            finally:
+                session.touch()
+        return ChatResponse(session_id=session.id, answer=answer)
+
+    @app.post("/chat/stream")
+    async def chat_stream(chat_request: ChatRequest, request: Request):
+        session = request.app.state.sessions.get_or_create(chat_request.session_id)
+
+        async def events() -> AsyncIterator[str]:
+            async with session.lock:
+                queue: asyncio.Queue = asyncio.Queue()
+                session.console.queue = queue
+                run = asyncio.create_task(session.agent.run(
+                    chat_request.message,
+                    on_answer_token=lambda token: queue.put_nowait(("token", token)),
+                ))
+                run.add_done_callback(lambda _: queue.put_nowait(None))
+                try:
+                    yield _sse("session", session.id)
+                    while True:
+                        item = await queue.get()
+                        if item is None:
+                            break
+                        yield _sse(*item)
+
+                    if run.exception() is not None:
+                        yield _sse("error", str(run.exception()))
+                    else:
+                        yield _sse("answer", run.result())
+                finally:
+                    # Runs on client disconnect too, abandoning the step cancels its in-flight tool calls
+                    run.cancel()
+                    with contextlib.suppress(asyncio.CancelledError, Exception):
+                        await run
+                    session.console.queue = None
+                    session.touch()
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str, request: Request):
+        if not request.app.state.sessions.delete(session_id):
+            raise HTTPException(status_code=404, detail="Unknown session")
+        return {"deleted": session_id}
+
+    @app.get("/stats")
+    async def stats(request: Request):
+        return {"sessions": len(request.app.state.sessions), **request.app.state.runtime.stats()}
+
+    return app
@@ -0,0 +1,28 @@
+from functools import lru_cache
+from typing import Callable, Optional
+
+# Rough average for English and JSON text with OpenAI tokenizers, used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=1)
+def _get_encoder() -> Optional[Callable[[str], list]]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base").encode
+    except ImportError:
+        return None
+
+def estimate_tokens(text: str) -> int:
+    encode = _get_encoder()
+    if encode is not None:
+        return len(encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+
+    # Cut proportionally, which is exact for the character estimate and close enough with tiktoken
+    keep = len(text) * max_tokens // tokens
+    return f"{text[:keep]}…[truncated {tokens - max_tokens} tokens]"
@@ -0,0 +1,241 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_CACHE_DIR = Path(os.getenv("POKEDEX_CACHE_DIR", Path.home() / ".cache" / "pokedex"))
+# Access times of disk hits waiting to be written, flushed with the next write or once there are this many
+MAX_PENDING_ACCESSES = 256
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """
+    Two-tier response cache keyed on the request URL.
+
+    Recently used bodies are kept in an in-memory LRU, everything else lives in a
+    sqlite file so the cache survives restarts. Entries older than `ttl` are not
+    served directly but are kept around so they can be revalidated with
+    If-None-Match / If-Modified-Since.
+
+    Memory hits are answered on the event loop. Every sqlite call runs on one worker thread instead,
+    in order, so disk reads and writes never block the loop. The access time of a disk hit, used to
+    evict the least recently used entries, is written in a batch with the next write rather than
+    committed on every hit.
+    """
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_DIR / "responses.sqlite",
+        ttl: float = 7 * 24 * 3600,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self._max_memory_bytes = max_memory_bytes
+        self._max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._memory_bytes = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+        self._pending_accesses: dict[str, float] = {}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Only syncs at checkpoints: a crash can lose the latest writes, which are refetched, but not corrupt the file
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+
+    async def get(self, url: str) -> Optional[CachedResponse]:
+        """Returns the cached entry for `url`, fresh or stale, and records a hit or a miss."""
+        entry = self._memory.get(url)
+        if entry is not None:
+            self._memory.move_to_end(url)
+            from_memory = True
+        else:
+            entry = await self._run(self._load, url)
+            if entry is not None:
+                self._remember(url, entry)
+            from_memory = False
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if not self.is_fresh(entry):
+            self.misses += 1
+            self.stale += 1
+            return entry
+
+        self.hits += 1
+        self.bytes_served += len(entry.body)
+        if from_memory:
+            self.memory_hits += 1
+        else:
+            self.disk_hits += 1
+        return entry
+
+    async def has_fresh(self, url: str) -> bool:
+        """Like get() but without loading the body or recording a hit or a miss."""
+        entry = self._memory.get(url)
+        if entry is not None:
+            return self.is_fresh(entry)
+        stored_at = await self._run(self._load_stored_at, url)
+        return stored_at is not None and time.time() - stored_at < self.ttl
+
+    async def put(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        entry = CachedResponse(body=body, etag=etag, last_modified=last_modified, stored_at=time.time())
+        self._remember(url, entry)
+        self.bytes_stored += len(body)
+        await self._run(self._store, url, entry)
+
+    async def revalidate(self, url: str, entry: CachedResponse):
+        """Marks a stale entry as fresh again after the server answered 304 Not Modified."""
+        entry.stored_at = time.time()
+        self._remember(url, entry)
+        self.revalidated += 1
+        self.bytes_served += len(entry.body)
+        await self._run(self._store_revalidation, url, entry.stored_at)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "revalidated": self.revalidated,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "bytes_stored": self.bytes_stored,
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def close(self):
+        self._executor.submit(self._close_db).result()
+        self._executor.shutdown()
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # The methods below run on the cache's worker thread
+
+    def _load(self, url: str) -> Optional[CachedResponse]:
+        row = self._db.execute(
+            "SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._pending_accesses[url] = time.time()
+        if len(self._pending_accesses) >= MAX_PENDING_ACCESSES:
+            self._flush_accesses()
+            self._db.commit()
+        return CachedResponse(body=row[0], etag=row[1], last_modified=row[2], stored_at=row[3])
+
+    def _load_stored_at(self, url: str) -> Optional[float]:
+        row = self._db.execute("SELECT stored_at FROM responses WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def _store(self, url: str, entry: CachedResponse):
+        self._flush_accesses()
+        previous = self._db.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, entry.body, entry.etag, entry.last_modified, entry.stored_at, entry.stored_at, len(entry.body)),
+        )
+        self._disk_bytes += len(entry.body) - (previous[0] if previous else 0)
+        self._evict_disk()
+        self._db.commit()
+
+    def _store_revalidation(self, url: str, stored_at: float):
+        self._flush_accesses()
+        self._db.execute(
+            "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?",
+            (stored_at, stored_at, url),
+        )
+        self._db.commit()
+
+    def _flush_accesses(self):
+        if self._pending_accesses:
+            self._db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?",
+                [(accessed_at, url) for url, accessed_at in self._pending_accesses.items()],
+            )
+            self._pending_accesses.clear()
+
+    def _close_db(self):
+        self._flush_accesses()
+        self._db.commit()
+        self._db.close()
+
+    def _remember(self, url: str, entry: CachedResponse):
+        previous = self._memory.pop(url, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous.body)
+        if len(entry.body) > self._max_memory_bytes:
+            return
+
+        self._memory[url] = entry
+        self._memory_bytes += len(entry.body)
+        while self._memory_bytes > self._max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.body)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self._max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT url, size FROM responses ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._disk_bytes -= size
+                if self._disk_bytes <= self._max_disk_bytes:
+                    break
@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class HttpClient:
+    """
+    Shared, pooled async transport for every HttpTool.
+
+    A single httpx.AsyncClient keeps connections alive between tool calls so that
+    repeated hits to the same host skip DNS, TCP and TLS setup. HTTP/2 is used when
+    requested and the optional `h2` package is installed (`pip install httpx[http2]`).
+    """
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 10,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._max_connections_per_host = max_connections_per_host
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            transport=transport,
+        )
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        async with self.stream(method, url, **kwargs) as response:
+            await response.aread()
+        return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        opened_connection = False
+
+        async def trace(event_name: str, info: dict):
+            nonlocal opened_connection
+            if event_name == "connection.connect_tcp.started":
+                opened_connection = True
+
+        host = urlsplit(url).netloc
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(self._max_connections_per_host))
+        async with slots:
+            async with self._client.stream(method, url, extensions={"trace": trace}, **kwargs) as response:
+                self.requests += 1
+                if opened_connection:
+                    self.new_connections += 1
+                else:
+                    self.reused_connections += 1
+                yield response
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / self.requests, 3) if self.requests else 0.0,
+            "http2": self.http2,
+        }
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal, Optional
+
+from tools.cache import DEFAULT_CACHE_DIR, ResponseCache
+from tools.http_client import HttpClient
+from tools.tool import HttpTool, ToolUnavailableError
+
+NAME_INDEX_VERSION = 1
+NAME_INDEX_PATH = DEFAULT_CACHE_DIR / "names.json"
+POKE_API = "https://pokeapi.co"
+# The resource kinds whose names are indexed, each is one list request to PokeAPI
+NAME_INDEX_KINDS = ("pokemon", "pokemon-species", "move", "ability", "type")
+# Above the size of every PokeAPI list, so one request returns all of a kind's names
+NAME_LIST_LIMIT = 100000
+# A name that is not exact is only replaced by a match this similar (Dice coefficient of the trigrams),
+# and that much more similar than the runner-up. Anything else is passed on as it is: PokeAPI answers 404
+# and resolve_pokeapi_names lists the candidates, rather than a wrong resource being fetched silently.
+AUTO_RESOLVE_SIMILARITY = 0.7
+AUTO_RESOLVE_MARGIN = 0.15
+
+_SEPARATORS = re.compile(r"[^a-z0-9]+")
+
+def normalize_name(name: str) -> str:
+    """PokeAPI's spelling of a name: "Mr. Mime" -> "mr-mime", "Farfetch'd" -> "farfetchd", "Flabébé" -> "flabebe"."""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    name = name.replace("'", "").replace(".", " ")
+    return _SEPARATORS.sub("-", name).strip("-")
+
+def _trigrams(name: str) -> set[str]:
+    padded = f"^{name}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+@dataclass(frozen=True)
+class NameMatch:
+    kind: str
+    name: str
+    id: int
+    similarity: float
+
+class _KindIndex:
+    def __init__(self, entries: list[tuple[str, int]]):
+        self.names = [name for name, _ in entries]
+        self.ids = [resource_id for _, resource_id in entries]
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self.trigram_counts = []
+        self.postings: dict[str, list[int]] = defaultdict(list)
+        for position, name in enumerate(self.names):
+            trigrams = _trigrams(name)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.postings[trigram].append(position)
+
+class NameIndex:
+    """
+    In-memory trigram index over the names of PokeAPI resources, one per resource kind.
+
+    An exact name is a dict lookup. Anything else is scored against the names sharing at least one
+    trigram with it, found through the inverted index, by the Dice coefficient of the two trigram sets,
+    so "mr mime", "garchomb" or "urshifu rapid" still find their candidates in microseconds.
+    """
+    def __init__(self, names: dict[str, list[tuple[str, int]]]):
+        # Entries read back from JSON are lists
+        self.names = {kind: [tuple(entry) for entry in entries] for kind, entries in names.items()}
+        self._kinds = {kind: _KindIndex(entries) for kind, entries in self.names.items()}
+
+    @property
+    def kinds(self) -> list[str]:
+        return list(self._kinds)
+
+    def search(self, kind: str, name: str, limit: int = 3) -> list[NameMatch]:
+        index = self._kinds.get(kind)
+        if index is None:
+            return []
+        name = normalize_name(name)
+        position = index.positions.get(name)
+        if position is not None:
+            return [NameMatch(kind, name, index.ids[position], 1.0)]
+
+        trigrams = _trigrams(name)
+        shared: dict[int, int] = defaultdict(int)
+        for trigram in trigrams:
+            for position in index.postings.get(trigram, ()):
+                shared[position] += 1
+
+        scored = sorted(
+            (2 * count / (len(trigrams) + index.trigram_counts[position]), -len(index.names[position]), position)
+            for position, count in shared.items()
+        )[-limit:]
+        return [
+            NameMatch(kind, index.names[position], index.ids[position], round(similarity, 3))
+            for similarity, _, position in reversed(scored)
+        ]
+
+    def resolve(self, kind: str, name: str) -> Optional[NameMatch]:
+        """The resource `name` refers to, None unless it is an exact name or one clear misspelling of a name."""
+        matches = self.search(kind, name, limit=2)
+        if not matches:
+            return None
+        runner_up = matches[1].similarity if len(matches) > 1 else 0.0
+        if matches[0].similarity == 1.0 or (
+            matches[0].similarity >= AUTO_RESOLVE_SIMILARITY and matches[0].similarity - runner_up >= AUTO_RESOLVE_MARGIN
+        ):
+            return matches[0]
+        return None
+
+    def save(self, path: Path = NAME_INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": NAME_INDEX_VERSION, "names": self.names}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = NAME_INDEX_PATH) -> Optional["NameIndex"]:
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != NAME_INDEX_VERSION:
+            return None
+        return cls(data["names"])
+
+_name_index: Optional[NameIndex] = None
+
+def get_name_index() -> Optional[NameIndex]:
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex.load()
+    return _name_index
+
+def resolve_name(kind: str, name: str) -> Optional[int]:
+    """The ID of the `kind` resource `name` refers to, None until the index is built or when it is not clear."""
+    index = get_name_index()
+    match = index.resolve(kind, name) if index else None
+    return match.id if match else None
+
+def resolve_pokeapi_names(
+    names: list[str],
+    kind: Optional[Literal["pokemon", "pokemon-species", "move", "ability", "type"]],
+):
+    """
+    Looks up PokeAPI IDs by name, tolerating misspellings and partial form names (e.g., "mr mime", "urshifu rapid").
+    The PokeAPI tools only resolve exact names and clear misspellings, use this when a name is not found.
+
+    Parameters:
+        names (list of str): The names to look up.
+        kind (str): The kind of resource. Null to search every kind.
+
+    Returns:
+        dict: For each name, the closest matches with their kind, PokeAPI name, ID and similarity (1.0 for an exact match).
+    """
+    index = get_name_index()
+    if index is None:
+        raise ToolUnavailableError("The name index is not available yet, use the PokeAPI tools with names instead.")
+
+    kinds = [kind] if kind else index.kinds
+    results = {}
+    for name in names:
+        matches = [match for searched in kinds for match in index.search(searched, name)]
+        matches.sort(key=lambda match: -match.similarity)
+        results[name] = [vars(match) for match in matches[:3]]
+    return results
+
+async def build_name_index(
+    client: HttpClient,
+    cache: Optional[ResponseCache] = None,
+    path: Path = NAME_INDEX_PATH,
+) -> NameIndex:
+    list_tool = HttpTool("resource_list", "", POKE_API, "/api/v2/{kind}/", "GET", [], client, cache)
+    pages = await asyncio.gather(*[list_tool.invoke(kind=kind, limit=NAME_LIST_LIMIT) for kind in NAME_INDEX_KINDS])
+
+    # List entries only link to their resource, the ID is the last segment of the URL
+    index = NameIndex({
+        kind: [(item["name"], int(item["url"].rstrip("/").rsplit("/", 1)[-1])) for item in page["results"]]
+        for kind, page in zip(NAME_INDEX_KINDS, pages)
+    })
+    index.save(path)
+
+    global _name_index
+    _name_index = index
+    return index
+
+if __name__ == "__main__":
+    async def main():
+        async with HttpClient() as client:
+            cache = ResponseCache()
+            index = await build_name_index(client, cache)
+            cache.close()
+        print(f"Indexed {sum(len(entries) for entries in index.names.values())} names to {NAME_INDEX_PATH}")
+
+    asyncio.run(main())
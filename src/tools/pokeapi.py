@@ -1,17 +1,80 @@
-import httpx
-import yaml
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
 
-from tools.tool import HttpTool
+from tools.cache import DEFAULT_CACHE_DIR, ResponseCache
+from tools.http_client import HttpClient
+from tools.name_index import resolve_name
+from tools.prefetch import Prefetcher
+from tools.tool import BatchHttpTool, HttpTool, Tool
 
 POKE_API = "https://pokeapi.co"
 POKE_API_SPEC = "https://raw.githubusercontent.com/PokeAPI/pokeapi/master/openapi.yml"
 
-def get_poke_api_tools():
-    response = httpx.get(POKE_API_SPEC)
+# Bump whenever the layout of the compiled artifact changes so stale files are recompiled.
+TOOL_ARTIFACT_VERSION = 1
+TOOL_ARTIFACT_PATH = DEFAULT_CACHE_DIR / "pokeapi_tools.json"
+# Shipped with the code and used until the background refresh has compiled the live spec into TOOL_ARTIFACT_PATH,
+# so a first start never waits for (or fails without) the network. Its etag is null: the first refresh replaces it.
+BUNDLED_TOOL_ARTIFACT_PATH = Path(__file__).parent / "pokeapi_tools.json"
+
+def get_poke_api_tools(
+    client: HttpClient,
+    cache: Optional[ResponseCache] = None,
+    artifact_path: Path = TOOL_ARTIFACT_PATH,
+    prefetcher: Optional[Prefetcher] = None
+):
+    artifact = load_tool_artifact(artifact_path) or load_tool_artifact(BUNDLED_TOOL_ARTIFACT_PATH)
+
+    tools: list[Tool] = []
+    for entry in artifact["tools"]:
+        tool = HttpTool(
+            name=entry["name"],
+            description=entry["description"],
+            base_url=POKE_API,
+            path=entry["path"],
+            method="GET",
+            params=entry["params"],
+            client=client,
+            cache=cache,
+            json_schema=entry["schema"],
+            prefetcher=prefetcher,
+            resolve_name=resolve_name
+        )
+        tools.append(tool)
+        if len(tool.path_fields) == 1:
+            tools.append(BatchHttpTool(tool))
+
+    return tools
+
+async def refresh_poke_api_tools(client: HttpClient, artifact_path: Path = TOOL_ARTIFACT_PATH) -> bool:
+    """Re-downloads the spec in the background and rewrites the artifact if it changed."""
+    artifact = load_tool_artifact(artifact_path)
+    headers = {"If-None-Match": artifact["etag"]} if artifact and artifact.get("etag") else {}
+
+    response = await client.request("GET", POKE_API_SPEC, headers=headers)
+    if response.status_code == 304:
+        return False
     response.raise_for_status()
-    spec = yaml.safe_load(response.text)
 
-    tools: list[HttpTool] = []
+    etag = response.headers.get("etag")
+    if artifact and etag and etag == artifact.get("etag"):
+        return False
+
+    # Parsing the full spec takes long enough to stall every request served on this loop
+    artifact = await asyncio.to_thread(compile_tool_artifact, response.text, etag)
+    await asyncio.to_thread(save_tool_artifact, artifact, artifact_path)
+    return True
+
+def compile_tool_artifact(spec_text: str, etag: Optional[str] = None) -> dict[str, Any]:
+    import yaml
+
+    spec = yaml.load(spec_text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+    tools = []
     for path, methods in spec.get("paths", {}).items():
         operation = methods.get("get")
         if not operation:
@@ -22,14 +85,54 @@ def get_poke_api_tools():
         params = operation.get("parameters", [])
         param_description = '\n/'.join([f"{param.get('name')}: {param.get('description', '')}" for param in params])
 
-        tool = HttpTool(
-            name=name,
-            description=f"{description}\n{param_description}",
-            base_url=POKE_API,
-            path=path,
-            method="GET",
-            params=params
-        )
-        tools.append(tool)
+        description = f"{description}\n{param_description}"
+        tools.append({
+            "name": name,
+            "description": description,
+            "path": path,
+            "params": params,
+            "schema": HttpTool.build_json_schema(name, description, params),
+        })
+
+    return {
+        "version": TOOL_ARTIFACT_VERSION,
+        "spec_url": POKE_API_SPEC,
+        "etag": etag,
+        "compiled_at": time.time(),
+        "tools": tools,
+    }
+
+def load_tool_artifact(artifact_path: Path = TOOL_ARTIFACT_PATH) -> Optional[dict[str, Any]]:
+    try:
+        with open(artifact_path, "rb") as f:
+            artifact = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    if artifact.get("version") != TOOL_ARTIFACT_VERSION:
+        return None
+    return artifact
+
+def save_tool_artifact(artifact: dict[str, Any], artifact_path: Path = TOOL_ARTIFACT_PATH):
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = artifact_path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(artifact, f)
+    os.replace(tmp_path, artifact_path)
+
+if __name__ == "__main__":
+    import sys
+
+    import httpx
 
-    return tools
\ No newline at end of file
+    # Regenerates the bundled artifact from the live spec, or from a local copy given as argument.
+    # The etag is left out so the first background refresh still compiles the live spec.
+    if len(sys.argv) > 1:
+        spec_text = Path(sys.argv[1]).read_text()
+    else:
+        response = httpx.get(POKE_API_SPEC)
+        response.raise_for_status()
+        spec_text = response.text
+    artifact = compile_tool_artifact(spec_text)
+    save_tool_artifact(artifact, BUNDLED_TOOL_ARTIFACT_PATH)
+    print(f"Compiled {len(artifact['tools'])} tools to {BUNDLED_TOOL_ARTIFACT_PATH}")
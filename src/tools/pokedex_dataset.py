@@ -0,0 +1,318 @@
+import asyncio
+import contextlib
+import fcntl
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Iterator, Literal, Optional
+
+from tools.cache import DEFAULT_CACHE_DIR, ResponseCache
+from tools.http_client import HttpClient
+from tools.pokemon_types import PokemonType
+from tools.tool import HttpTool, ToolUnavailableError
+
+DATASET_VERSION = 1
+DATASET_PATH = DEFAULT_CACHE_DIR / "pokedex.bin"
+DATASET_MAGIC = b"PKDX"
+SPECIES_COUNT = 1025
+# Requests of the build in flight at once. The build fetches two resources per species in the background,
+# so like the Prefetcher it leaves most of the HTTP client's per-host slots to the agent's tool calls.
+BUILD_CONCURRENCY = 2
+
+POKE_API = "https://pokeapi.co"
+STATS = ["hp", "attack", "defense", "special_attack", "special_defense", "speed"]
+TYPES = [pokemon_type.value for pokemon_type in PokemonType]
+NO_TYPE = 0xFF
+NO_ABILITY = 0xFFFF
+GENERATIONS = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "v": 5, "vi": 6, "vii": 7, "viii": 8, "ix": 9}
+
+# name -> array typecode. Every column holds one value per species, in Pokédex order.
+COLUMNS = {
+    "id": "H",
+    "type1": "B",
+    "type2": "B",
+    **{stat: "H" for stat in STATS},
+    "ability1": "H",
+    "ability2": "H",
+    "hidden_ability": "H",
+    "generation": "B",
+}
+
+class PokedexDataset:
+    """
+    Column-oriented snapshot of every Pokémon species.
+
+    Numeric columns are stored back to back in a single file and memory-mapped on
+    load, types and abilities are dictionary encoded, so queries only touch the
+    columns they filter or sort on.
+    """
+    def __init__(self, names: list[str], abilities: list[str], columns: dict[str, Any]):
+        self.names = names
+        self.abilities = abilities
+        self.columns = columns
+        self._ability_codes = {ability: code for code, ability in enumerate(abilities)}
+        # Inverted index so type filters only scan matching rows
+        self._rows_by_type: list[list[int]] = [[] for _ in TYPES]
+        for row in range(len(names)):
+            self._rows_by_type[columns["type1"][row]].append(row)
+            if columns["type2"][row] != NO_TYPE:
+                self._rows_by_type[columns["type2"][row]].append(row)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]]) -> "PokedexDataset":
+        abilities = sorted({ability for row in rows for ability in row["abilities"] if ability})
+        ability_codes = {ability: code for code, ability in enumerate(abilities)}
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+
+        for row in sorted(rows, key=lambda row: row["id"]):
+            types = row["types"] + [None]
+            columns["id"].append(row["id"])
+            columns["type1"].append(TYPES.index(types[0]))
+            columns["type2"].append(TYPES.index(types[1]) if types[1] else NO_TYPE)
+            for stat in STATS:
+                columns[stat].append(row["stats"][stat])
+            for column, ability in zip(("ability1", "ability2", "hidden_ability"), row["abilities"]):
+                columns[column].append(ability_codes[ability] if ability else NO_ABILITY)
+            columns["generation"].append(row["generation"])
+
+        names = [row["name"] for row in sorted(rows, key=lambda row: row["id"])]
+        return cls(names, abilities, columns)
+
+    def save(self, path: Path = DATASET_PATH):
+        layout = {}
+        offset = 0
+        for name, column in self.columns.items():
+            layout[name] = [column.typecode, offset, len(column)]
+            offset += len(column) * column.itemsize
+            offset += -offset % 8
+
+        header = json.dumps({
+            "version": DATASET_VERSION,
+            "byteorder": sys.byteorder,
+            "names": self.names,
+            "abilities": self.abilities,
+            "columns": layout,
+        }).encode()
+        data_start = len(DATASET_MAGIC) + 4 + len(header)
+        data_start += -data_start % 8
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(DATASET_MAGIC + struct.pack("<I", len(header)) + header)
+            for name, column in self.columns.items():
+                f.seek(data_start + layout[name][1])
+                f.write(column.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = DATASET_PATH) -> Optional["PokedexDataset"]:
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if buffer[:len(DATASET_MAGIC)] != DATASET_MAGIC:
+            return None
+        (header_size,) = struct.unpack_from("<I", buffer, len(DATASET_MAGIC))
+        header_start = len(DATASET_MAGIC) + 4
+        header = json.loads(buffer[header_start:header_start + header_size])
+        if header["version"] != DATASET_VERSION or header["byteorder"] != sys.byteorder:
+            return None
+
+        data_start = header_start + header_size
+        data_start += -data_start % 8
+        view = memoryview(buffer)
+        columns = {}
+        for name, (typecode, offset, length) in header["columns"].items():
+            start = data_start + offset
+            columns[name] = view[start:start + length * array(typecode).itemsize].cast(typecode)
+
+        return cls(header["names"], header["abilities"], columns)
+
+    def query(
+        self,
+        types: Optional[list[str]] = None,
+        generation: Optional[int] = None,
+        ability: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = True,
+        limit: int = 10,
+    ) -> list[dict[str, Any]]:
+        rows = range(len(self))
+
+        if types:
+            type_rows = [set(self._rows_by_type[TYPES.index(pokemon_type)]) for pokemon_type in types]
+            rows = sorted(set.intersection(*type_rows))
+        if generation:
+            generations = self.columns["generation"]
+            rows = [row for row in rows if generations[row] == generation]
+        if ability:
+            code = self._ability_codes.get(ability, -1)
+            ability1, ability2, hidden = (self.columns[column] for column in ("ability1", "ability2", "hidden_ability"))
+            rows = [row for row in rows if code in (ability1[row], ability2[row], hidden[row])]
+
+        if sort_by:
+            key = self._total if sort_by == "total" else self.columns[sort_by].__getitem__
+            select = heapq.nlargest if descending else heapq.nsmallest
+            rows = select(limit, rows, key=key)
+        else:
+            rows = list(rows)[:limit]
+
+        return [self.row(row) for row in rows]
+
+    def row(self, row: int) -> dict[str, Any]:
+        types = [TYPES[self.columns["type1"][row]]]
+        if self.columns["type2"][row] != NO_TYPE:
+            types.append(TYPES[self.columns["type2"][row]])
+        abilities = [
+            self.abilities[self.columns[column][row]]
+            for column in ("ability1", "ability2", "hidden_ability")
+            if self.columns[column][row] != NO_ABILITY
+        ]
+        stats = {stat: self.columns[stat][row] for stat in STATS}
+        return {
+            "id": self.columns["id"][row],
+            "name": self.names[row],
+            "types": types,
+            "generation": self.columns["generation"][row],
+            "abilities": abilities,
+            "stats": stats,
+            "total": sum(stats.values()),
+        }
+
+    def _total(self, row: int) -> int:
+        return sum(self.columns[stat][row] for stat in STATS)
+
+_dataset: Optional[PokedexDataset] = None
+
+def get_pokedex_dataset() -> Optional[PokedexDataset]:
+    global _dataset
+    if _dataset is None:
+        _dataset = PokedexDataset.load()
+    return _dataset
+
+def query_pokedex(
+    types: Optional[list[str]],
+    generation: Optional[int],
+    ability: Optional[str],
+    sort_by: Optional[Literal["hp", "attack", "defense", "special_attack", "special_defense", "speed", "total"]],
+    descending: Optional[bool],
+    limit: Optional[int],
+):
+    """
+    Queries a local snapshot of all Pokémon species at once. Use this instead of fetching Pokémon one by one
+    for set-level questions such as "fastest Fire types" or "highest base attack in Generation 4".
+
+    Parameters:
+        types (list of str): Only include Pokémon having all of these types (e.g., ["fire"] or ["water", "ground"]). Null for any.
+        generation (int): Only include Pokémon introduced in this generation (1-9). Null for any.
+        ability (str): Only include Pokémon that can have this ability (PokeAPI name, e.g., "levitate"). Null for any.
+        sort_by (str): Base stat to sort by, or "total" for the base stat total. Null keeps Pokédex order.
+        descending (bool): Sort from highest to lowest. Defaults to true.
+        limit (int): Maximum number of Pokémon to return. Defaults to 10.
+
+    Returns:
+        list of dict: id, name, types, generation, abilities, base stats and base stat total of each match.
+    """
+    dataset = get_pokedex_dataset()
+    if dataset is None:
+        raise ToolUnavailableError("The local Pokédex dataset is not available yet, use the PokeAPI tools instead.")
+
+    types = [pokemon_type.lower() for pokemon_type in types] if types else types
+    unknown_types = [pokemon_type for pokemon_type in types or [] if pokemon_type not in TYPES]
+    if unknown_types:
+        return f"Unknown types: {', '.join(unknown_types)}. Valid types are: {', '.join(TYPES)}."
+
+    return dataset.query(
+        types=types,
+        generation=generation,
+        ability=ability,
+        sort_by=sort_by,
+        descending=True if descending is None else descending,
+        limit=limit or 10,
+    )
+
+@contextlib.contextmanager
+def _build_lock(path: Path) -> Iterator[bool]:
+    """Whether this process holds the build lock next to `path`. Released on exit, or when the process dies."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+async def build_pokedex_dataset(
+    client: HttpClient,
+    cache: Optional[ResponseCache] = None,
+    path: Path = DATASET_PATH,
+    concurrency: int = BUILD_CONCURRENCY,
+) -> Optional[PokedexDataset]:
+    """
+    Builds the dataset from PokeAPI and saves it to `path`. Only one process per host builds it, e.g. one
+    of the gunicorn workers: None is returned while another one is, get_pokedex_dataset loads its result.
+    """
+    with _build_lock(path) as acquired:
+        if not acquired:
+            return None
+        # Built by another process in the meantime
+        dataset = PokedexDataset.load(path)
+        if dataset is None:
+            dataset = await _build(client, cache, path, concurrency)
+
+    global _dataset
+    _dataset = dataset
+    return dataset
+
+async def _build(client: HttpClient, cache: Optional[ResponseCache], path: Path, concurrency: int) -> PokedexDataset:
+    pokemon_tool = HttpTool("pokemon", "", POKE_API, "/api/v2/pokemon/{id}/", "GET", [], client, cache)
+    species_tool = HttpTool("pokemon_species", "", POKE_API, "/api/v2/pokemon-species/{id}/", "GET", [], client, cache)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(tool: HttpTool, species_id: int) -> dict[str, Any]:
+        async with semaphore:
+            return await tool.invoke(id=species_id)
+
+    async def fetch_row(species_id: int) -> dict[str, Any]:
+        pokemon, species = await asyncio.gather(fetch(pokemon_tool, species_id), fetch(species_tool, species_id))
+
+        abilities = [None, None, None]
+        for entry in pokemon["abilities"]:
+            abilities[2 if entry["is_hidden"] else entry["slot"] - 1] = entry["ability"]["name"]
+        return {
+            "id": species_id,
+            "name": pokemon["name"],
+            "types": [entry["type"]["name"] for entry in sorted(pokemon["types"], key=lambda entry: entry["slot"])],
+            "stats": {entry["stat"]["name"].replace("-", "_"): entry["base_stat"] for entry in pokemon["stats"]},
+            "abilities": abilities,
+            "generation": GENERATIONS[species["generation"]["name"].split("-")[-1]],
+        }
+
+    rows = await asyncio.gather(*[fetch_row(species_id) for species_id in range(1, SPECIES_COUNT + 1)])
+    PokedexDataset.from_rows(rows).save(path)
+    return PokedexDataset.load(path)
+
+if __name__ == "__main__":
+    async def main():
+        async with HttpClient() as client:
+            cache = ResponseCache()
+            dataset = await build_pokedex_dataset(client, cache)
+            cache.close()
+        if dataset is None:
+            print(f"Another process is building {DATASET_PATH}")
+        else:
+            print(f"Saved {len(dataset)} Pokémon to {DATASET_PATH}")
+
+    asyncio.run(main())
@@ -179,6 +179,46 @@ TYPE_CHART = {
     },
 }
 
+ALL_TYPES = list(PokemonType)
+TYPE_INDEX = {pokemon_type.value: index for index, pokemon_type in enumerate(ALL_TYPES)}
+
+# EFFECTIVENESS_MATRIX[attacker][defender], indexed like ALL_TYPES
+EFFECTIVENESS_MATRIX = tuple(
+    tuple(TYPE_CHART.get(attacker, {}).get(defender, 1.0) for defender in ALL_TYPES)
+    for attacker in ALL_TYPES
+)
+
+# Every single and dual defending type (18 + 153 = 171 entries), keyed by the sorted type indices.
+# Each entry holds the multiplier of all 18 attacking types against that combination.
+DEFENDER_EFFECTIVENESS = {
+    (first, second) if first != second else (first,): tuple(
+        EFFECTIVENESS_MATRIX[attacker][first] * (EFFECTIVENESS_MATRIX[attacker][second] if first != second else 1.0)
+        for attacker in range(len(ALL_TYPES))
+    )
+    for first in range(len(ALL_TYPES))
+    for second in range(first, len(ALL_TYPES))
+}
+
+def _type_index(pokemon_type: str) -> int:
+    index = TYPE_INDEX.get(pokemon_type.lower())
+    if index is None:
+        raise ValueError(f"{pokemon_type!r} is not a valid PokemonType")
+    return index
+
+def _defender_key(defender_types: list[str]) -> tuple:
+    return tuple(sorted({_type_index(defender) for defender in defender_types}))
+
+def _defender_row(defender_types: list[str]) -> tuple:
+    key = _defender_key(defender_types)
+    if key in DEFENDER_EFFECTIVENESS:
+        return DEFENDER_EFFECTIVENESS[key]
+
+    row = [1.0] * len(ALL_TYPES)
+    for defender in key:
+        for attacker in range(len(ALL_TYPES)):
+            row[attacker] *= EFFECTIVENESS_MATRIX[attacker][defender]
+    return tuple(row)
+
 def get_effectiveness_multiplier(attack_type: str, defender_types: list[str]):
     """
     Returns the type effectiveness multiplier.
@@ -190,8 +230,81 @@ def get_effectiveness_multiplier(attack_type: str, defender_types: list[str]):
     Returns:
     float: Effectiveness multiplier (e.g., 0.5, 1.0, 2.0).
     """
-    effectiveness = 1.0
-    for defender in defender_types:
-        defender_type = PokemonType(defender)
-        effectiveness *= TYPE_CHART.get(PokemonType(attack_type), {}).get(defender_type, 1.0)
-    return effectiveness
+    return _defender_row(defender_types)[_type_index(attack_type)]
+
+def get_matchups_against_defenders(attack_types: list[str], defenders: list[list[str]]):
+    """
+    Returns the effectiveness of one attack type, or a whole move set, against many defenders at once.
+
+    Parameters:
+    attack_types (list of str): One or more attacking move types (e.g., a Pokémon's move set types).
+    defenders (list of list of str): The types of each defending Pokémon, one or two types per defender.
+
+    Returns:
+    list of dict: For each defender, the multiplier of every attack type and the best attack type to use.
+    """
+    if not attack_types:
+        return "attack_types must list at least one attack type."
+
+    attackers = [(attack_type, _type_index(attack_type)) for attack_type in attack_types]
+    matchups = []
+    for defender_types in defenders:
+        row = _defender_row(defender_types)
+        multipliers = {attack_type: row[index] for attack_type, index in attackers}
+        best = max(multipliers, key=multipliers.get)
+        matchups.append({
+            "defender_types": defender_types,
+            "multipliers": multipliers,
+            "best_attack_type": best,
+            "best_multiplier": multipliers[best],
+        })
+    return matchups
+
+def get_attackers_against_defender(defender_types: list[str]):
+    """
+    Returns the effectiveness of every attacking type against one defender.
+
+    Parameters:
+    defender_types (list of str): One or two defending Pokémon types.
+
+    Returns:
+    dict: Attacking types grouped by multiplier (e.g., "4.0": ["ground"], "0.0": ["electric"]).
+    """
+    row = _defender_row(defender_types)
+    grouped: dict[str, list[str]] = {}
+    for multiplier, pokemon_type in sorted(zip(row, ALL_TYPES), key=lambda pair: -pair[0]):
+        grouped.setdefault(str(multiplier), []).append(pokemon_type.value)
+    return grouped
+
+def get_team_type_analysis(team: list[list[str]]):
+    """
+    Returns the weaknesses and resistances of a whole team against every attacking type.
+
+    Parameters:
+    team (list of list of str): The types of each team member, one or two types per member.
+
+    Returns:
+    dict: For each attacking type, how many members are weak, resistant or immune to it,
+    plus the attacking types the team is most weak to and the ones nobody resists.
+    """
+    rows = [_defender_row(member_types) for member_types in team]
+    analysis = {}
+    for index, attack_type in enumerate(ALL_TYPES):
+        multipliers = [row[index] for row in rows]
+        analysis[attack_type.value] = {
+            "weak": sum(1 for multiplier in multipliers if multiplier > 1.0),
+            "resistant": sum(1 for multiplier in multipliers if 0.0 < multiplier < 1.0),
+            "immune": sum(1 for multiplier in multipliers if multiplier == 0.0),
+        }
+
+    return {
+        "by_attack_type": analysis,
+        "shared_weaknesses": [
+            attack_type for attack_type, counts in analysis.items()
+            if counts["weak"] > counts["resistant"] + counts["immune"]
+        ],
+        "unresisted": [
+            attack_type for attack_type, counts in analysis.items()
+            if counts["resistant"] + counts["immune"] == 0
+        ],
+    }
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from tools.cache import ResponseCache
+from tools.http_client import HttpClient
+from tools.projection import compile_field_spec
+from tools.selective_json import decode_selected, to_builtin
+
+# The links an agent most often follows next, per PokeAPI resource. Types already embed their
+# damage relations and moves are too many to be worth it.
+PREFETCH_LINKS = {
+    "pokemon": ["species", "types[*].type"],
+    "pokemon-species": ["evolution_chain"],
+}
+
+class Prefetcher:
+    """
+    Speculatively warms the response cache with the resources linked from each PokeAPI response,
+    while the LLM is still reasoning about it.
+
+    Prefetches run in the background, at most `max_concurrency` at a time so they never take the
+    HTTP client's per-host slots from real tool calls, and are dropped once `max_bytes_per_minute`
+    were downloaded in the current minute. Links of prefetched resources are followed up to `max_depth`.
+    """
+    def __init__(
+        self,
+        client: HttpClient,
+        cache: ResponseCache,
+        max_depth: int = 1,
+        max_concurrency: int = 2,
+        max_bytes_per_minute: int = 4 * 1024 * 1024,
+        links: dict[str, list[str]] = PREFETCH_LINKS,
+        max_seen_urls: int = 10000,
+    ):
+        self._client = client
+        self._cache = cache
+        self.max_depth = max_depth
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_bytes_per_minute = max_bytes_per_minute
+        self._link_specs = {kind: compile_field_spec(paths) for kind, paths in links.items()}
+        # URLs already scheduled once, so popular links are not re-checked against the cache every time
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self._max_seen_urls = max_seen_urls
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._unconsumed: set[str] = set()
+        self._window_started_at = time.monotonic()
+        self._window_bytes = 0
+
+        self.scheduled = 0
+        self.fetched = 0
+        self.consumed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes_fetched = 0
+
+    def schedule(self, url: str, body: bytes, depth: int = 0):
+        """Starts prefetching the links in `body`, the resource at `url` reached `depth` links away from a tool call."""
+        if depth >= self.max_depth:
+            return
+        spec = self._link_specs.get(_resource_kind(url))
+        if not spec:
+            return
+        try:
+            # Only the link fields are decoded, the rest of the resource is skipped
+            links = to_builtin(decode_selected(body, spec))
+        except ValueError:
+            return
+
+        for link in _collect_urls(links):
+            if link in self._seen:
+                continue
+            self._seen[link] = None
+            if len(self._seen) > self._max_seen_urls:
+                self._seen.popitem(last=False)
+
+            self.scheduled += 1
+            task = asyncio.ensure_future(self._prefetch(link, depth + 1))
+            self._inflight[link] = task
+            task.add_done_callback(lambda _, link=link: self._inflight.pop(link, None))
+
+    async def wait(self, url: str):
+        """Lets a tool call for a URL that is being prefetched share that download instead of starting another."""
+        task = self._inflight.get(url)
+        if task is not None:
+            await asyncio.shield(task)
+
+    def consume(self, url: str):
+        """Called on every cache hit, counts the prefetched entries that a tool call actually used."""
+        if url in self._unconsumed:
+            self._unconsumed.discard(url)
+            self.consumed += 1
+
+    async def join(self):
+        while self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "scheduled": self.scheduled,
+            "fetched": self.fetched,
+            "consumed": self.consumed,
+            "consumed_ratio": round(self.consumed / self.fetched, 3) if self.fetched else 0.0,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+    async def aclose(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+
+    async def _prefetch(self, url: str, depth: int):
+        async with self._semaphore:
+            if await self._cache.has_fresh(url):
+                return
+            if not self._has_bandwidth():
+                self.skipped += 1
+                return
+
+            try:
+                response = await self._client.request("GET", url)
+            except httpx.HTTPError:
+                self.failed += 1
+                return
+            if response.status_code != 200:
+                self.failed += 1
+                return
+
+            self._window_bytes += len(response.content)
+            self.bytes_fetched += len(response.content)
+            self.fetched += 1
+            await self._cache.put(
+                url,
+                response.content,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+            self._unconsumed.add(url)
+
+        if depth < self.max_depth:
+            self.schedule(url, response.content, depth)
+
+    def _has_bandwidth(self) -> bool:
+        now = time.monotonic()
+        if now - self._window_started_at >= 60:
+            self._window_started_at = now
+            self._window_bytes = 0
+        return self._window_bytes < self._max_bytes_per_minute
+
+def _resource_kind(url: str) -> Optional[str]:
+    # https://pokeapi.co/api/v2/pokemon/6/ -> pokemon
+    segments = urlsplit(url).path.strip("/").split("/")
+    return segments[2] if len(segments) >= 4 and segments[:2] == ["api", "v2"] else None
+
+def _collect_urls(data: Any) -> list[str]:
+    if isinstance(data, dict):
+        urls = [data["url"]] if isinstance(data.get("url"), str) else []
+        for key, value in data.items():
+            if key != "url":
+                urls.extend(_collect_urls(value))
+        return urls
+    if isinstance(data, list):
+        return [url for item in data for url in _collect_urls(item)]
+    return []
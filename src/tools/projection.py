@@ -0,0 +1,62 @@
+import re
+from typing import Any
+
+WILDCARD = "*"
+_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\*|\d+)\]")
+
+def parse_field_path(path: str) -> list:
+    """Splits a path such as `stats[*].stat.name` into ["stats", "*", "stat", "name"]."""
+    tokens = []
+    for key, index in _PATH_TOKEN.findall(path):
+        if key:
+            tokens.append(key)
+        elif index == WILDCARD:
+            tokens.append(WILDCARD)
+        else:
+            tokens.append(int(index))
+    return tokens
+
+def compile_field_spec(paths: list[str]) -> dict:
+    """Merges field paths into a tree, e.g. ["types[*].type.name", "id"] -> {"types": {"*": {"type": {"name": {}}}}, "id": {}}."""
+    spec: dict = {}
+    for path in paths:
+        node = spec
+        for token in parse_field_path(path):
+            node = node.setdefault(token, {})
+    return spec
+
+def project(data: Any, spec: dict) -> Any:
+    """Keeps only the parts of `data` selected by a field spec. An empty spec keeps the whole subtree."""
+    if not spec:
+        return data
+
+    if isinstance(data, list):
+        if WILDCARD in spec:
+            return [project(item, spec[WILDCARD]) for item in data]
+        return [
+            project(data[index], subspec)
+            for index, subspec in spec.items()
+            if isinstance(index, int) and -len(data) <= index < len(data)
+        ]
+
+    if isinstance(data, dict):
+        return {
+            key: project(data[key], subspec)
+            for key, subspec in spec.items()
+            if key in data
+        }
+
+    return data
+
+def drop_redundant_urls(data: Any) -> Any:
+    """Drops the `url` of resources already identified by a sibling `name` or `id`, a link on its own is kept."""
+    if isinstance(data, dict):
+        redundant = "name" in data or "id" in data
+        return {
+            key: drop_redundant_urls(value)
+            for key, value in data.items()
+            if not (key == "url" and redundant)
+        }
+    if isinstance(data, list):
+        return [drop_redundant_urls(item) for item in data]
+    return data
@@ -0,0 +1,65 @@
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+from tools.tool import Tool
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Very short words and these fillers match nearly every tool description
+_STOPWORDS = {"the", "and", "for", "with", "what", "which", "this", "that", "are", "from", "can", "you", "all", "get"}
+
+def _terms(text: str) -> list[str]:
+    # Crude stemming, "evolve" / "evolution" / "evolutions" all become "evol"
+    return [
+        word[:4]
+        for word in _WORD.findall(text.lower().replace("_", " "))
+        if len(word) > 2 and word not in _STOPWORDS
+    ]
+
+class ToolRouter:
+    """
+    Offline BM25 ranking of the tool registry against a user query.
+
+    Only the `top_k` most relevant tools plus the pinned ones are sent to the model,
+    always in the same (alphabetical) order so that identical selections produce an
+    identical prompt prefix and benefit from provider-side prompt caching.
+    """
+    def __init__(self, tools: Iterable[Tool], top_k: int = 12, pinned: Iterable[str] = (), k1: float = 1.2, b: float = 0.75):
+        self._tools = sorted(tools, key=lambda tool: tool.name)
+        self._top_k = top_k
+        self._pinned = set(pinned)
+        self._k1 = k1
+        self._b = b
+
+        self._documents = [Counter(_terms(f"{tool.name} {tool.name} {tool.description or ''}")) for tool in self._tools]
+        self._lengths = [sum(document.values()) for document in self._documents]
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        document_frequency = Counter(term for document in self._documents for term in document)
+        self._idf = {
+            term: math.log(1 + (len(self._documents) - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def select(self, query: str) -> list[Tool]:
+        query_terms = set(_terms(query))
+        scores = [
+            (self._score(index, query_terms), index)
+            for index, tool in enumerate(self._tools)
+            if tool.name not in self._pinned
+        ]
+        ranked = {index for score, index in sorted(scores, reverse=True)[:self._top_k] if score > 0}
+        return [
+            tool for index, tool in enumerate(self._tools)
+            if tool.name in self._pinned or index in ranked
+        ]
+
+    def _score(self, index: int, query_terms: set[str]) -> float:
+        document = self._documents[index]
+        length_norm = self._k1 * (1 - self._b + self._b * self._lengths[index] / self._average_length)
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if frequency:
+                score += self._idf[term] * frequency * (self._k1 + 1) / (frequency + length_norm)
+        return score
@@ -0,0 +1,175 @@
+import functools
+import json
+import keyword
+import re
+from json.decoder import scanstring
+from typing import Any, Union
+
+from tools.projection import WILDCARD, project
+from tracing import tracer
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_CONTAINER_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+_scan_once = json.JSONDecoder().scan_once
+# Every byte but quotes and brackets, deleted to leave the structure of a document
+_NOT_STRUCTURAL = bytes(byte for byte in range(256) if byte not in b'"[]{}')
+
+class Record:
+    """
+    The kept top-level fields of a decoded document. Each set of fields gets its own subclass with
+    matching __slots__, so a memoized result holds a handful of attributes instead of a dict per object.
+    """
+    __slots__ = ()
+
+    def __init__(self, values: dict[str, Any]):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+@functools.lru_cache(maxsize=256)
+def record_type(name: str, fields: tuple[str, ...]) -> type[Record]:
+    """The Record subclass for one endpoint and set of fields, e.g. PokemonRetrieveRecord(id, types)."""
+    class_name = "".join(part.capitalize() for part in re.split(r"[^0-9a-zA-Z]+", name) if part) + "Record"
+    return type(class_name, (Record,), {"__slots__": fields})
+
+def decode_selected(body: Union[bytes, str], field_spec: dict, name: str = "") -> Any:
+    """
+    Decodes only the parts of a JSON document selected by a field spec, the same parts
+    projection.project would keep from the fully decoded document.
+
+    Unselected values are skipped without being decoded: strings and scalars with the json module's
+    C scanner, arrays and objects by finding their closing bracket with str.find and str.count,
+    which is several times faster than walking their tokens in Python. The bracket counting does not
+    look inside strings, so it is only used when no string of the document contains a bracket, otherwise
+    arrays and objects are skipped token by token. A top-level object is returned as a Record.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        text = body.decode("utf-8")
+    else:
+        text, body = body, body.encode("utf-8")
+    try:
+        count_brackets = not _has_bracketed_strings(body)
+        data, end = _decode_value(text, _skip_whitespace(text, 0), field_spec, count_brackets)
+        if _skip_whitespace(text, end) != len(text):
+            raise ValueError("Extra data")
+    except (ValueError, IndexError, StopIteration):
+        tracer.current().add("decode_fallbacks")
+        data = project(json.loads(text), field_spec)
+
+    if isinstance(data, dict) and all(key.isidentifier() and not keyword.iskeyword(key) for key in data):
+        return record_type(name, tuple(data))(data)
+    return data
+
+def to_builtin(data: Any) -> Any:
+    """Replaces the Records nested in `data` with dicts, e.g. before encoding it as JSON."""
+    if isinstance(data, Record):
+        data = data.to_dict()
+    if isinstance(data, dict):
+        return {key: to_builtin(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [to_builtin(item) for item in data]
+    return data
+
+def _has_bracketed_strings(body: bytes) -> bool:
+    if b"\\" in body:
+        # Escaped backslashes first, so what is left of a run of backslashes escapes the character after it
+        body = body.replace(b"\\\\", b"").replace(b'\\"', b"")
+    # Down to its quotes and brackets, a string without brackets is a pair of adjacent quotes
+    return b'"' in body.translate(None, _NOT_STRUCTURAL).replace(b'""', b"")
+
+def _skip_whitespace(text: str, index: int) -> int:
+    return _WHITESPACE.match(text, index).end()
+
+def _decode_value(text: str, index: int, spec: dict, count_brackets: bool) -> tuple[Any, int]:
+    char = text[index]
+    if spec and char == "{" and all(isinstance(key, str) and key != WILDCARD for key in spec):
+        return _decode_object(text, index, spec, count_brackets)
+    if spec and char == "[" and WILDCARD in spec:
+        return _decode_array(text, index, spec[WILDCARD], count_brackets)
+    # Everything else is decoded whole: whole subtrees, scalars, and arrays selected by index
+    value, end = _scan_once(text, index)
+    return project(value, spec), end
+
+def _decode_object(text: str, index: int, spec: dict, count_brackets: bool) -> tuple[dict, int]:
+    values = {}
+    index = _skip_whitespace(text, index + 1)
+    if text[index] == "}":
+        return values, index + 1
+
+    while True:
+        if text[index] != '"':
+            raise ValueError(f"Expected a key at {index}")
+        key, index = scanstring(text, index + 1)
+        index = _skip_whitespace(text, index)
+        if text[index] != ":":
+            raise ValueError(f"Expected ':' at {index}")
+        index = _skip_whitespace(text, index + 1)
+
+        if key in spec:
+            values[key], index = _decode_value(text, index, spec[key], count_brackets)
+        else:
+            index = _skip_value(text, index, count_brackets)
+
+        index = _skip_whitespace(text, index)
+        if text[index] == "}":
+            return values, index + 1
+        if text[index] != ",":
+            raise ValueError(f"Expected ',' or '}}' at {index}")
+        index = _skip_whitespace(text, index + 1)
+
+def _decode_array(text: str, index: int, spec: dict, count_brackets: bool) -> tuple[list, int]:
+    items = []
+    index = _skip_whitespace(text, index + 1)
+    if text[index] == "]":
+        return items, index + 1
+
+    while True:
+        item, index = _decode_value(text, index, spec, count_brackets)
+        items.append(item)
+        index = _skip_whitespace(text, index)
+        if text[index] == "]":
+            return items, index + 1
+        if text[index] != ",":
+            raise ValueError(f"Expected ',' or ']' at {index}")
+        index = _skip_whitespace(text, index + 1)
+
+def _skip_value(text: str, index: int, count_brackets: bool) -> int:
+    opener = text[index]
+    if opener == '"':
+        return scanstring(text, index + 1)[1]
+    if opener not in "[{":
+        return _scan_once(text, index)[1]
+    if not count_brackets:
+        return _skip_container(text, index)
+
+    closer = "]" if opener == "[" else "}"
+    opened, closed, start = 0, 0, index
+    while True:
+        end = text.find(closer, start)
+        if end < 0:
+            raise ValueError(f"Unterminated value at {index}")
+        opened += text.count(opener, start, end)
+        closed += text.count(closer, start, end) + 1
+        start = end + 1
+        if opened == closed:
+            return start
+
+def _skip_container(text: str, index: int) -> int:
+    depth = 0
+    for match in _CONTAINER_TOKEN.finditer(text, index):
+        char = match.group()[0]
+        if char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise ValueError(f"Unterminated value at {index}")
@@ -1,23 +1,251 @@
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
 from typing import Optional
+
 import httpx
 
-def get_most_used_pokemons(generation: int, elo: int):
-    """
-    Returns the top 10 most overused Pokémon for a given generation.
+from tools.cache import DEFAULT_CACHE_DIR
+from tools.http_client import HttpClient
+
+SMOGON_STATS = "https://www.smogon.com/stats"
+SMOGON_CACHE_DIR = DEFAULT_CACHE_DIR / "smogon"
+
+@dataclass
+class UsageRow:
+    rank: int
+    name: str
+    usage_percent: float
+    raw: int
+    raw_percent: float
+    real: int
+    real_percent: float
+
+@dataclass
+class UsageTable:
+    month: str
+    generation: int
+    tier: str
+    elo: int
+    total_battles: int
+    rows: list[UsageRow]
 
-    Parameters:
-        generation (int): The generation of the game (e.g., Generation 4 corresponds to Diamond and Pearl).
-        elo (int): the minimum Elo rating
-        - 0: All battles, no rating filter (includes casual/low-ranked matches)
-        - 1500, 1630, 1760: Only includes matches where players had at least that Elo (skill rating). Higher = more competitive.
+    def find(self, name: str) -> Optional[UsageRow]:
+        normalized = normalize_name(name)
+        return next((row for row in self.rows if normalize_name(row.name) == normalized), None)
 
-    Returns:
-        str: A formatted string listing the rank, Pokémon name, and usage percentage.
+class SmogonStats:
     """
-    month = "2025-06"
-    try:
-        response = httpx.get(f"https://www.smogon.com/stats/{month}/gen{generation}ou-{elo}.txt")
-    except httpx.RequestError as exc:
-        return f"Request error: {exc}"
-    
-    return "\n".join(response.text.splitlines()[2:15])
+    Parsed Smogon usage statistics.
+
+    Each usage file is streamed and parsed once into a UsageTable, then kept in memory
+    and on disk per (month, generation, tier, elo) so later queries never re-download it.
+    """
+    def __init__(self, client: HttpClient, cache_dir: Path = SMOGON_CACHE_DIR):
+        self._client = client
+        self._cache_dir = cache_dir
+        self._tables: dict[tuple, UsageTable] = {}
+        self._loading: dict[tuple, asyncio.Task] = {}
+
+    async def get_table(self, month: Optional[str], generation: int, tier: str, elo: int) -> UsageTable:
+        if month:
+            return await self._get_table((month, generation, tier.lower(), elo))
+
+        # Smogon publishes a month's stats in the first days of the next one, so fall back a month if needed
+        for candidate in _recent_months(2):
+            try:
+                return await self._get_table((candidate, generation, tier.lower(), elo))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404:
+                    raise
+        raise ValueError(f"No usage stats published recently for gen{generation}{tier}-{elo}")
+
+    async def get_most_used_pokemons(
+        self,
+        generation: int,
+        elo: int,
+        month: Optional[str],
+        tier: Optional[str],
+        top_n: Optional[int],
+    ):
+        """
+        Returns the most used Pokémon for a given generation, tier and month.
+
+        Parameters:
+            generation (int): The generation of the game (e.g., Generation 4 corresponds to Diamond and Pearl).
+            elo (int): the minimum Elo rating
+            - 0: All battles, no rating filter (includes casual/low-ranked matches)
+            - 1500, 1630, 1760: Only includes matches where players had at least that Elo (skill rating). Higher = more competitive.
+            - For Generation 9 OU the cutoffs are 0, 1500, 1695 and 1825.
+            month (str): The month of the stats in YYYY-MM format (e.g., "2025-06"). Null for the latest available month.
+            tier (str): The Smogon tier (e.g., "ou", "uu", "ubers", "vgc2025regh"). Null for "ou".
+            top_n (int): How many Pokémon to return. Null for 10.
+
+        Returns:
+            list of dict: The rank, Pokémon name, usage percentage and raw counts of each Pokémon.
+        """
+        table = await self.get_table(month, generation, tier or "ou", elo)
+        return [asdict(row) for row in table.rows[:top_n or 10]]
+
+    async def get_pokemon_usage(
+        self,
+        name: str,
+        generation: int,
+        elo: int,
+        month: Optional[str],
+        tier: Optional[str],
+    ):
+        """
+        Returns the usage statistics of a single Pokémon in a given generation, tier and month.
+
+        Parameters:
+            name (str): The Pokémon name as written by Smogon (e.g., "Great Tusk", "Landorus-Therian").
+            generation (int): The generation of the game.
+            elo (int): the minimum Elo rating (0, 1500, 1630, 1760; 0, 1500, 1695, 1825 for Generation 9 OU).
+            month (str): The month of the stats in YYYY-MM format. Null for the latest available month.
+            tier (str): The Smogon tier (e.g., "ou", "uu", "ubers"). Null for "ou".
+
+        Returns:
+            dict: The rank, usage percentage and raw counts of the Pokémon, or a message if it is unused.
+        """
+        table = await self.get_table(month, generation, tier or "ou", elo)
+        row = table.find(name)
+        if row is None:
+            return f"{name} has no recorded usage in gen{generation}{tier or 'ou'}-{elo} for {table.month}."
+        return asdict(row)
+
+    async def get_usage_changes(
+        self,
+        generation: int,
+        elo: int,
+        month: str,
+        previous_month: str,
+        tier: Optional[str],
+        top_n: Optional[int],
+    ):
+        """
+        Compares Pokémon usage between two months, e.g., to find rising or falling Pokémon.
+
+        Parameters:
+            generation (int): The generation of the game.
+            elo (int): the minimum Elo rating (0, 1500, 1630, 1760; 0, 1500, 1695, 1825 for Generation 9 OU).
+            month (str): The later month in YYYY-MM format.
+            previous_month (str): The earlier month in YYYY-MM format.
+            tier (str): The Smogon tier (e.g., "ou", "uu", "ubers"). Null for "ou".
+            top_n (int): How many of the later month's top Pokémon to compare. Null for 10.
+
+        Returns:
+            list of dict: For each Pokémon, its rank and usage in both months and the usage delta in percentage points.
+        """
+        current, previous = await asyncio.gather(
+            self.get_table(month, generation, tier or "ou", elo),
+            self.get_table(previous_month, generation, tier or "ou", elo),
+        )
+
+        changes = []
+        for row in current.rows[:top_n or 10]:
+            before = previous.find(row.name)
+            changes.append({
+                "name": row.name,
+                "rank": row.rank,
+                "previous_rank": before.rank if before else None,
+                "usage_percent": row.usage_percent,
+                "previous_usage_percent": before.usage_percent if before else 0.0,
+                "usage_delta": round(row.usage_percent - (before.usage_percent if before else 0.0), 5),
+            })
+        return changes
+
+    async def _get_table(self, key: tuple) -> UsageTable:
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        table = self._load(key)
+        if table is None:
+            # Concurrent requests for the same file share a single download
+            task = self._loading.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._download(key))
+                self._loading[key] = task
+                task.add_done_callback(lambda _: self._loading.pop(key, None))
+            table = await asyncio.shield(task)
+
+        self._tables[key] = table
+        return table
+
+    async def _download(self, key: tuple) -> UsageTable:
+        month, generation, tier, elo = key
+        total_battles = 0
+        rows = []
+
+        async with self._client.stream("GET", f"{SMOGON_STATS}/{month}/gen{generation}{tier}-{elo}.txt") as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip().startswith("Total battles:"):
+                    total_battles = int(line.split(":")[1])
+                    continue
+
+                row = _parse_usage_line(line)
+                if row is not None:
+                    rows.append(row)
+
+        table = UsageTable(month, generation, tier, elo, total_battles, rows)
+        self._save(table)
+        return table
+
+    def _path(self, key: tuple) -> Path:
+        month, generation, tier, elo = key
+        return self._cache_dir / f"{month}-gen{generation}{tier}-{elo}.json"
+
+    def _load(self, key: tuple) -> Optional[UsageTable]:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        data["rows"] = [UsageRow(*row) for row in data["rows"]]
+        return UsageTable(**data)
+
+    def _save(self, table: UsageTable):
+        path = self._path((table.month, table.generation, table.tier, table.elo))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = asdict(table)
+        # Rows are stored as positional lists to keep the files small
+        data["rows"] = [list(asdict(row).values()) for row in table.rows]
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+def _parse_usage_line(line: str) -> Optional[UsageRow]:
+    # | 1    | Great Tusk         | 35.12345% | 123456 | 30.123% | 98765  | 29.12%  |
+    cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+    if len(cells) != 7 or not cells[0].isdigit():
+        return None
+
+    return UsageRow(
+        rank=int(cells[0]),
+        name=cells[1],
+        usage_percent=float(cells[2].rstrip("%")),
+        raw=int(cells[3]),
+        raw_percent=float(cells[4].rstrip("%")),
+        real=int(cells[5]),
+        real_percent=float(cells[6].rstrip("%")),
+    )
+
+def normalize_name(name: str) -> str:
+    return "".join(char for char in name.lower() if char.isalnum())
+
+def _recent_months(count: int) -> list[str]:
+    year, month = date.today().year, date.today().month
+    months = []
+    for _ in range(count):
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        months.append(f"{year}-{month:02d}")
+    return months
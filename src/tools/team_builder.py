@@ -0,0 +1,302 @@
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from tools.pokedex_dataset import NO_TYPE, STATS, get_pokedex_dataset
+from tools.pokemon_types import ALL_TYPES, DEFENDER_EFFECTIVENESS, EFFECTIVENESS_MATRIX
+from tools.smogon import SmogonStats, normalize_name
+from tools.tool import ToolUnavailableError
+
+TYPE_COUNT = len(ALL_TYPES)
+# Coverage bits: the types a member's STAB moves hit super effectively, then the attack types it resists or is immune to
+OFFENSE_MASK = (1 << TYPE_COUNT) - 1
+DEFENSE_MASK = OFFENSE_MASK << TYPE_COUNT
+GOAL_MASKS = {"offense": OFFENSE_MASK, "defense": DEFENSE_MASK, "both": OFFENSE_MASK | DEFENSE_MASK}
+# The search is split into at least this many subtrees per worker, so one deep subtree does not hold up the answer
+SUBTREES_PER_WORKER = 4
+
+def _popcount(mask: int) -> int:
+    # int.bit_count() needs Python 3.10
+    return bin(mask).count("1")
+
+def _bits(indices) -> int:
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+def _type_masks(key: tuple[int, ...]) -> tuple[int, int]:
+    """(coverage, weaknesses) bitsets of a single or dual type combination, as indices into ALL_TYPES."""
+    row = DEFENDER_EFFECTIVENESS[key]
+    offense = _bits(
+        defender for attacker in key for defender in range(TYPE_COUNT) if EFFECTIVENESS_MATRIX[attacker][defender] > 1.0
+    )
+    resisted = _bits(attacker for attacker in range(TYPE_COUNT) if row[attacker] < 1.0)
+    weaknesses = _bits(attacker for attacker in range(TYPE_COUNT) if row[attacker] > 1.0)
+    return offense | resisted << TYPE_COUNT, weaknesses
+
+TYPE_MASKS = {key: _type_masks(key) for key in DEFENDER_EFFECTIVENESS}
+
+@dataclass(frozen=True)
+class TeamSearch:
+    """
+    One team search: `coverage` and `weaknesses` hold each candidate's coverage bitset and number of
+    weaknesses, candidates are sorted by weaknesses so the lowest set bits of a candidate set are its
+    least weak members. `coverers` holds, for each coverage bit, the bitset of candidates covering it.
+    """
+    coverage: tuple[int, ...]
+    weaknesses: tuple[int, ...]
+    coverers: tuple[int, ...]
+    team_size: int
+    target: int
+    # The most bits a single candidate covers
+    most_covered: int
+
+    @classmethod
+    def create(cls, candidates: list[tuple[int, int]], team_size: int, target: int) -> "TeamSearch":
+        coverers = tuple(
+            _bits(index for index, (coverage, _) in enumerate(candidates) if coverage >> bit & 1)
+            for bit in range(2 * TYPE_COUNT)
+        )
+        return cls(
+            coverage=tuple(coverage & target for coverage, _ in candidates),
+            weaknesses=tuple(weaknesses for _, weaknesses in candidates),
+            coverers=coverers,
+            team_size=min(team_size, len(candidates)),
+            target=target,
+            most_covered=max(_popcount(coverage & target) for coverage, _ in candidates),
+        )
+
+    def root(self) -> "Node":
+        return (), 0, 0, (1 << len(self.coverage)) - 1, self.target
+
+    def greedy(self) -> "Best":
+        """A good first team to prune against: repeatedly adds the candidate covering the most, the least weak one on ties."""
+        team, covered, weaknesses = [], 0, 0
+        remaining = list(range(len(self.coverage)))
+        for _ in range(self.team_size):
+            pick = max(remaining, key=lambda index: (_popcount(self.coverage[index] & ~covered), -self.weaknesses[index]))
+            remaining.remove(pick)
+            team.append(pick)
+            covered |= self.coverage[pick]
+            weaknesses += self.weaknesses[pick]
+        return _popcount(covered), weaknesses, tuple(sorted(team))
+
+# (team, covered bits, weaknesses, candidates still allowed, bits still worth covering)
+Node = tuple[tuple[int, ...], int, int, int, int]
+# (covered bit count, weaknesses, team)
+Best = tuple[int, int, tuple[int, ...]]
+
+def _lowest_bits(mask: int, count: int) -> list[int]:
+    indices = []
+    while mask and len(indices) < count:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+def _beats(covered: int, weaknesses: int, best: Best) -> bool:
+    return covered > best[0] or (covered == best[0] and weaknesses < best[1])
+
+def _children(search: TeamSearch, node: Node) -> Optional[list[Node]]:
+    """
+    Branches on the uncovered bit the fewest allowed candidates cover: either one of them joins the team,
+    the earlier ones excluded so each team is enumerated once, or none does and the bit is given up.
+    None for a node whose team is complete, or already covers every bit still worth covering.
+    """
+    team, covered, weaknesses, allowed, target = node
+    uncovered = target & ~covered
+    if not uncovered or len(team) == search.team_size:
+        return None
+
+    fewest = None
+    for bit in _lowest_bits(uncovered, TYPE_COUNT * 2):
+        coverers = search.coverers[bit] & allowed
+        if fewest is None or _popcount(coverers) < _popcount(fewest[1]):
+            fewest = bit, coverers
+            if _popcount(coverers) <= 1:
+                break
+    bit, coverers = fewest
+
+    children = []
+    for index in _lowest_bits(coverers, _popcount(coverers)):
+        allowed &= ~(1 << index)
+        children.append((
+            (*team, index), covered | search.coverage[index], weaknesses + search.weaknesses[index], allowed, target,
+        ))
+    children.append((team, covered, weaknesses, allowed & ~search.coverers[bit], target & ~(1 << bit)))
+    return children
+
+def _visit(search: TeamSearch, node: Node, best: Best) -> Best:
+    team, covered, weaknesses, allowed, target = node
+    # Bounds: every bit still worth covering gets covered, as far as the open slots can cover them,
+    # and the open slots go to the least weak allowed candidates
+    slots = search.team_size - len(team)
+    filler = _lowest_bits(allowed, slots)
+    if len(filler) < slots:
+        return best
+    covered_bound = min(_popcount(target), _popcount(covered) + slots * search.most_covered)
+    weaknesses += sum(search.weaknesses[index] for index in filler)
+    if not _beats(covered_bound, weaknesses, best):
+        return best
+
+    children = _children(search, node)
+    if children is None:
+        for index in filler:
+            covered |= search.coverage[index]
+        if _beats(_popcount(covered), weaknesses, best):
+            return _popcount(covered), weaknesses, tuple(sorted((*team, *filler)))
+        return best
+
+    for child in children:
+        best = _visit(search, child, best)
+    return best
+
+def search_subtrees(search: TeamSearch, nodes: list[Node], best: Best) -> Best:
+    """Branch and bound below each of `nodes`. Module level, so it can run on a process pool."""
+    for node in nodes:
+        best = _visit(search, node, best)
+    return best
+
+def _split(search: TeamSearch, count: int) -> list[Node]:
+    nodes = [search.root()]
+    while len(nodes) < count:
+        expanded = []
+        for node in nodes:
+            expanded.extend(_children(search, node) or [node])
+        if len(expanded) == len(nodes):
+            break
+        nodes = expanded
+    return nodes
+
+async def find_best_team(search: TeamSearch, executor: Optional[Executor] = None, workers: int = 1) -> Best:
+    """
+    The team covering the most bits of the search target, the one with the fewest weaknesses among those.
+    The subtrees of the search run on `executor`, or the loop's default thread pool, each pruned against
+    the greedy team, which is also the answer when none of them finds a better one.
+    """
+    best = search.greedy()
+    # A single worker searches the whole tree, which prunes better than subtrees searched apart
+    count = workers * SUBTREES_PER_WORKER if workers > 1 else 1
+    nodes = _split(search, count)
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(executor, search_subtrees, search, nodes[start::count], best)
+        for start in range(min(len(nodes), count))
+    ])
+    # Ties are broken on the team itself, so the answer does not depend on which worker found it first
+    return min(results, key=lambda result: (-result[0], result[1], result[2]))
+
+def _type_names(key: tuple[int, ...]) -> list[str]:
+    return [ALL_TYPES[index].value for index in key]
+
+class TeamBuilder:
+    """
+    Finds the team of types, or of Pokémon, that covers the type chart best.
+
+    Each candidate type combination is a pair of bitsets over the 18 types: what its STAB moves hit super
+    effectively plus the attack types it resists, and what it is weak to. Teams are searched exhaustively,
+    with branch and bound, on a process pool: a team covers the union of its members' bits, so the search
+    branches on the least covered bit and prunes teams that cannot beat the best one found so far.
+    """
+    def __init__(self, smogon_stats: SmogonStats, executor: Optional[Executor] = None, workers: int = 1):
+        self.smogon_stats = smogon_stats
+        self.executor = executor
+        self.workers = workers
+
+    async def find_coverage_team(
+        self,
+        team_size: Optional[int],
+        goal: Optional[Literal["offense", "defense", "both"]],
+        types_only: Optional[bool],
+        generation: Optional[int],
+        tier: Optional[str],
+        month: Optional[str],
+    ):
+        """
+        Builds the team of types or Pokémon that covers all types best, in one call, instead of checking matchups one by one.
+        A type is covered when a member's own types hit it super effectively (offense) or a member resists it (defense).
+        Among the teams covering the most, the one with the fewest weaknesses in total is returned.
+
+        Parameters:
+            team_size (int): Number of members (1-6). Null for 6.
+            goal (str): "offense", "defense" or "both". Null for "both".
+            types_only (bool): Return type combinations, not Pokémon. Null for Pokémon when the local Pokédex is available.
+            generation (int): Only Pokémon introduced up to this generation. Null for any.
+            tier (str): Only Pokémon used in this Smogon tier (e.g., "ou") of the generation, or 9. Null for any.
+            month (str): The tier's usage stats month in YYYY-MM format. Null for the latest.
+
+        Returns:
+            dict: The types (and name) of each member, the types missed offensively and defensively, and the total weaknesses.
+        """
+        target = GOAL_MASKS[goal or "both"]
+        if not 1 <= (team_size or 6) <= 6:
+            return "team_size must be between 1 and 6."
+
+        dataset = get_pokedex_dataset()
+        if dataset is None and (generation or tier or types_only is False):
+            raise ToolUnavailableError(
+                "The local Pokédex dataset is not available yet, so Pokémon cannot be picked. Retry with types_only."
+            )
+
+        if dataset is None or (types_only and not (generation or tier)):
+            representatives = {key: None for key in TYPE_MASKS}
+        else:
+            representatives = await self._representatives(dataset, generation, tier, month)
+            if not representatives:
+                return "No Pokémon match these constraints."
+
+        # Sorted by weaknesses first, so the search and its bounds see the least weak candidates first
+        keys = sorted(representatives, key=lambda key: (_popcount(TYPE_MASKS[key][1]), -_popcount(TYPE_MASKS[key][0]), key))
+        search = TeamSearch.create(
+            [(TYPE_MASKS[key][0], _popcount(TYPE_MASKS[key][1])) for key in keys], team_size or 6, target,
+        )
+        _, weaknesses, team = await find_best_team(search, self.executor, self.workers)
+
+        members = []
+        covered = 0
+        for index in team:
+            key = keys[index]
+            covered |= TYPE_MASKS[key][0]
+            member = {"types": _type_names(key)}
+            if representatives[key] is not None and not types_only:
+                member = {"name": representatives[key], **member}
+            members.append(member)
+
+        result = {"team": members, "total_weaknesses": weaknesses}
+        if target & OFFENSE_MASK:
+            result["hits_super_effectively"] = _type_names(i for i in range(TYPE_COUNT) if covered >> i & 1)
+            result["not_hit_super_effectively"] = _type_names(i for i in range(TYPE_COUNT) if not covered >> i & 1)
+        if target & DEFENSE_MASK:
+            result["unresisted"] = _type_names(i for i in range(TYPE_COUNT) if not covered >> (TYPE_COUNT + i) & 1)
+        return result
+
+    async def _representatives(self, dataset, generation: Optional[int], tier: Optional[str], month: Optional[str]):
+        """
+        The type combinations of the Pokémon matching the constraints, each with the Pokémon standing for it:
+        the most used one in the tier, otherwise the one with the highest base stat total. Two members of the
+        same types would add weaknesses and no coverage, so one Pokémon per combination is enough.
+        """
+        rows = range(len(dataset))
+        if generation:
+            rows = [row for row in rows if dataset.columns["generation"][row] <= generation]
+
+        if tier:
+            table = await self.smogon_stats.get_table(month, generation or 9, tier, 0)
+            rows_by_name = {normalize_name(dataset.names[row]): row for row in rows}
+            ranked = []
+            for usage in table.rows:
+                # Smogon names forms ("Landorus-Therian"), which fall back to the base species and its types
+                row = rows_by_name.get(normalize_name(usage.name), rows_by_name.get(normalize_name(usage.name.split("-")[0])))
+                if row is not None:
+                    ranked.append(row)
+        else:
+            ranked = sorted(rows, key=lambda row: -sum(dataset.columns[stat][row] for stat in STATS))
+
+        representatives = {}
+        for row in ranked:
+            type1, type2 = dataset.columns["type1"][row], dataset.columns["type2"][row]
+            key = tuple(sorted({type1, type2} - {NO_TYPE}))
+            representatives.setdefault(key, dataset.names[row])
+        return representatives
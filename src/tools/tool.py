@@ -1,15 +1,35 @@
 from abc import abstractmethod
+import asyncio
+import functools
 import json
-import httpx
 import inspect
+from concurrent.futures import Executor
 from urllib.parse import urlencode
-from typing import Any, Callable, Literal, get_args, get_origin
+from typing import Any, Callable, Literal, Optional, Union, get_args, get_origin
 from string import Formatter
 
+from tools.cache import ResponseCache
+from tools.http_client import HttpClient
+from tools.prefetch import Prefetcher
+from tools.projection import project
+from tools.selective_json import decode_selected
+from tracing import tracer
+
+# List endpoints are fetched in pages of this size, concurrently, when more items are requested
+LIST_PAGE_SIZE = 100
+
+class ToolUnavailableError(Exception):
+    """
+    Raised by a tool that cannot answer yet, e.g. while the dataset it reads is still being built.
+    The message tells the model what to do instead, and unlike a result it is never memoized.
+    """
+
 class Tool:
-    def __init__(self, name: str, description):
+    def __init__(self, name: str, description, timeout: Optional[float] = None):
         self.name = name
         self.description = description
+        # Overrides the agent wide tool call timeout when set
+        self.timeout = timeout
     
     @abstractmethod
     async def invoke(self, **kwargs):
@@ -19,25 +39,79 @@ class Tool:
     def get_json_schema(self) -> dict[str, Any]:
         pass
 
+    async def fetch(self, **kwargs):
+        """The unprojected result, from which project_result derives the result for any field spec."""
+        return await self.invoke(**kwargs)
+
+    def project_result(self, result: Any, field_spec: Optional[dict]) -> Any:
+        return project(result, field_spec) if field_spec else result
+
+    def is_cacheable(self, result: Any) -> bool:
+        """Whether the same call may be answered with `result` again for the rest of the session."""
+        return True
+
+    async def invoke_projected(self, field_spec: dict, **kwargs):
+        """Invokes the tool for the parts of its result selected by a field spec only."""
+        return self.project_result(await self.fetch(**kwargs), field_spec)
+
 class FnTool(Tool):
-    def __init__(self, fn: Callable) -> None:
-        super().__init__(fn.__name__, fn.__doc__)
+    """
+    Coroutine functions are awaited on the event loop. Plain functions run on `executor`, or the loop's
+    default thread pool, so a slow one never stalls the other tool calls; `inline` skips the hop for
+    functions that return in microseconds. A process pool needs a picklable, module level function.
+
+    On timeout or cancellation the caller stops waiting, but a function already running on a thread
+    or process cannot be interrupted: it runs to completion and its result is dropped.
+    """
+    def __init__(
+        self,
+        fn: Callable,
+        executor: Optional[Executor] = None,
+        inline: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        super().__init__(fn.__name__, fn.__doc__, timeout)
         self.fn = fn
+        self.executor = executor
+        self.inline = inline
+        # Introspected once here rather than on every call
+        self._signature = inspect.signature(fn)
+        self._is_coroutine_function = inspect.iscoroutinefunction(fn)
+        self._json_schema: Optional[dict[str, Any]] = None
 
     async def invoke(self, **kwargs):
-        return self.fn(**kwargs)
+        with tracer.span("tool.invoke", tool=self.name):
+            if self.timeout is None:
+                return await self._call(kwargs)
+            return await asyncio.wait_for(self._call(kwargs), timeout=self.timeout)
+
+    async def _call(self, kwargs: dict[str, Any]):
+        if self._is_coroutine_function:
+            return await self.fn(**kwargs)
+
+        if self.inline:
+            result = self.fn(**kwargs)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, functools.partial(self.fn, **kwargs))
+        # e.g. a plain function returning a coroutine
+        if inspect.isawaitable(result):
+            result = await result
+        return result
     
     def get_json_schema(self) -> dict[str, Any]:
-        signature = inspect.signature(self.fn)
+        if self._json_schema:
+            return self._json_schema
+
         properties = {}
         required = []
 
-        for name, param in signature.parameters.items():
+        # Strict mode requires every property to be listed, optional ones are expressed as nullable
+        for name, param in self._signature.parameters.items():
             properties[name] = self._convert_py_type_to_json_schema(param.annotation)
-            if param.default is inspect.Parameter.empty:
-                required.append(name)
+            required.append(name)
 
-        return {
+        self._json_schema = {
             "type": "function",
             "function": {
                 "name": self.name,
@@ -51,6 +125,7 @@ class FnTool(Tool):
                 "strict": True
             }
         }
+        return self._json_schema
 
     def _convert_py_type_to_json_schema(self, py_type: Any) -> dict[str, Any]:
         origin = get_origin(py_type)
@@ -65,6 +140,15 @@ class FnTool(Tool):
 
         if py_type in type_dict:
             return {"type": type_dict[py_type]}
+        elif origin is Union and type(None) in args:
+            non_null_args = [arg for arg in args if arg is not type(None)]
+            schema = self._convert_py_type_to_json_schema(non_null_args[0])
+            schema = {**schema, "type": [schema["type"], "null"]}
+            if "enum" in schema:
+                schema["enum"] = schema["enum"] + [None]
+            return schema
+        elif origin is Literal:
+            return {"type": type_dict[type(args[0])], "enum": list(args)}
         elif origin in [list, tuple]:
             item_type = args[0] if args else Any
             return {
@@ -85,23 +169,37 @@ class HttpTool(Tool):
         base_url: str,
         path: str,
         method: Literal["GET", "POST", "PUT", "DELETE", "PATCH"],
-        params: list
+        params: list,
+        client: HttpClient,
+        cache: Optional[ResponseCache] = None,
+        json_schema: Optional[dict[str, Any]] = None,
+        prefetcher: Optional[Prefetcher] = None,
+        resolve_name: Optional[Callable[[str, str], Optional[int]]] = None
     ):
         super().__init__(name, description)
         self.base_url = base_url.rstrip('/')
         self.path = path
         self.method = method
         self.params = params
-
-    def _build_url(self, **kwargs):
-        formatter = Formatter()
-        field_names = [
+        self.client = client
+        self.cache = cache
+        self.prefetcher = prefetcher
+        # (resource kind, name) -> ID or None, so an exact name or a clear misspelling in the path is fixed before the request
+        self.resolve_name = resolve_name
+        self._json_schema = json_schema
+        self.path_fields = [
             field_name
-            for _, field_name, _, _ in formatter.parse(self.path)
+            for _, field_name, _, _ in Formatter().parse(path)
             if field_name
         ]
-        
-        path_kwargs = {k: kwargs[k] for k in field_names if k in kwargs}
+        # e.g. "pokemon-species" for /api/v2/pokemon-species/{id}/
+        segments = path.strip("/").split("/")
+        self.resource_kind = segments[-2] if len(segments) > 1 and segments[-1].startswith("{") else None
+        param_names = {param["name"] for param in params}
+        self.paginated = method == "GET" and {"limit", "offset"} <= param_names
+
+    def _build_url(self, **kwargs):
+        path_kwargs = {k: kwargs[k] for k in self.path_fields if k in kwargs}
         query_kwargs = {k: v for k, v in kwargs.items() if (k not in path_kwargs) and v}
         
         populated_path = self.path.format(**path_kwargs)
@@ -114,34 +212,116 @@ class HttpTool(Tool):
         return url
     
     async def invoke(self, **kwargs):
-        url = self._build_url(**kwargs)
-        json_dump = json.dumps(kwargs)
-
-        try:
-            async with httpx.AsyncClient() as client:
-                if self.method == "GET":
-                    response = await client.get(f"{url}")
-                elif self.method == "POST":
-                    response = await client.post(url, json=json_dump)
-                elif self.method == "PUT":
-                    response = await client.put(url, json=json_dump)
-                elif self.method == "DELETE":
-                    response = await client.delete(url)
-                elif self.method == "PATCH":
-                    response = await client.patch(url, json=json_dump)
-                else:
-                    raise ValueError("Invalid method")
-            
-                response.raise_for_status()
-                return response.json()
-        except Exception:
-            raise
-        return None
+        return self.project_result(await self.fetch(**kwargs), None)
+
+    async def fetch(self, **kwargs):
+        """
+        A single resource is returned as its response body, the same bytes the response cache holds,
+        so each field spec only decodes its own fields from it. Anything else is decoded in full.
+        """
+        with tracer.span("tool.invoke", tool=self.name, method=self.method):
+            if self.resolve_name and self.resource_kind:
+                kwargs = self._resolve_path_names(kwargs)
+            url = self._build_url(**kwargs)
+            json_dump = json.dumps(kwargs)
+
+            if self.method == "GET":
+                if self.paginated and int(kwargs.get("limit") or 0) > LIST_PAGE_SIZE:
+                    return await self._get_pages(kwargs)
+                body = await self._get(url)
+                if self.prefetcher:
+                    self.prefetcher.schedule(url, body)
+                return body
+            elif self.method in ("POST", "PUT", "PATCH"):
+                response = await self.client.request(self.method, url, json=json_dump)
+            elif self.method == "DELETE":
+                response = await self.client.request("DELETE", url)
+            else:
+                raise ValueError("Invalid method")
+
+            response.raise_for_status()
+            tracer.current().add("response_bytes", len(response.content))
+            return response.json()
+
+    def is_cacheable(self, result: Any) -> bool:
+        return self.method == "GET"
+
+    def project_result(self, result: Any, field_spec: Optional[dict]) -> Any:
+        if isinstance(result, bytes):
+            return decode_selected(result, field_spec, self.name) if field_spec else json.loads(result)
+        return super().project_result(result, field_spec)
+
+    def _resolve_path_names(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        resolved = dict(kwargs)
+        for field in self.path_fields:
+            value = kwargs.get(field)
+            if isinstance(value, str) and not value.strip().isdigit():
+                resource_id = self.resolve_name(self.resource_kind, value)
+                if resource_id is not None:
+                    resolved[field] = str(resource_id)
+                    tracer.current().add("names_resolved")
+        return resolved
+
+    async def _get_pages(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        # Pages start at the requested offset, so the same query always maps to the same cached page URLs
+        offset = int(kwargs.get("offset") or 0)
+        end = offset + int(kwargs["limit"])
+        bodies = await asyncio.gather(*[
+            self._get(self._build_url(**{**kwargs, "offset": start, "limit": min(LIST_PAGE_SIZE, end - start)}))
+            for start in range(offset, end, LIST_PAGE_SIZE)
+        ])
+        pages = [json.loads(body) for body in bodies]
+        return {
+            **pages[-1],
+            "previous": pages[0].get("previous"),
+            "results": [item for page in pages for item in page.get("results", [])],
+        }
+
+    async def _get(self, url: str) -> bytes:
+        span = tracer.current()
+        if self.prefetcher:
+            await self.prefetcher.wait(url)
+        cached = await self.cache.get(url) if self.cache else None
+        if cached and self.cache.is_fresh(cached):
+            if self.prefetcher:
+                self.prefetcher.consume(url)
+            span.add("cache_hits")
+            span.add("response_bytes", len(cached.body))
+            return cached.body
+
+        headers = cached.validators() if cached else {}
+        response = await self.client.request("GET", url, headers=headers)
+        if cached and response.status_code == 304:
+            await self.cache.revalidate(url, cached)
+            span.add("cache_revalidations")
+            span.add("response_bytes", len(cached.body))
+            return cached.body
+
+        response.raise_for_status()
+        span.add("cache_misses")
+        span.add("response_bytes", len(response.content))
+        if self.cache:
+            await self.cache.put(
+                url,
+                response.content,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+        return response.content
     
     def get_json_schema(self) -> dict[str, Any]:
+        if self._json_schema:
+            return self._json_schema
+
+        self._json_schema = self.build_json_schema(self.name, self.description, self.params)
+        return self._json_schema
+
+    @staticmethod
+    def build_json_schema(name: str, description: str, params: list) -> dict[str, Any]:
+        """The tool schema of an endpoint with the given OpenAPI parameters, no client needed to derive it."""
         properties = {}
         
-        for param in self.params:
+        for param in params:
             param_name = param["name"]
             properties[param_name] = param.get("schema", {"type": "string"})
 
@@ -150,8 +330,8 @@ class HttpTool(Tool):
         return {
             "type": "function",
             "function": {
-                "name": self.name,
-                "description": self.description,
+                "name": name,
+                "description": description,
                 "parameters": {
                     "type": "object",
                     "properties": properties,
@@ -160,4 +340,73 @@ class HttpTool(Tool):
                 },
                 "strict": True
             }
-        }
\ No newline at end of file
+        }
+
+class BatchHttpTool(Tool):
+    """
+    The multi-ID variant of a path-templated HttpTool: fetches the resource for many IDs or names
+    concurrently, through the tool's response cache, and returns them as one result keyed by the
+    requested ID. A failed lookup is reported in place instead of failing the whole batch.
+    """
+    def __init__(self, tool: HttpTool, max_ids: int = 50):
+        (self.param,) = tool.path_fields
+        super().__init__(
+            f"{tool.name}_batch",
+            f"Same as {tool.name}, for up to {max_ids} IDs or names in one call.",
+        )
+        self.tool = tool
+        self.path = tool.path
+        self.max_ids = max_ids
+        self._json_schema: Optional[dict[str, Any]] = None
+
+    async def invoke(self, ids: list[Union[str, int]]):
+        return self.project_result(await self.fetch(ids), None)
+
+    async def fetch(self, ids: list[Union[str, int]]):
+        with tracer.span("tool.invoke", tool=self.name, ids=len(ids)):
+            keys = list(dict.fromkeys(str(resource_id).strip().lower() for resource_id in ids))
+            if len(keys) > self.max_ids:
+                raise ValueError(f"{self.name} accepts at most {self.max_ids} IDs, got {len(keys)}")
+
+            results = await asyncio.gather(
+                *[self.tool.fetch(**{self.param: key}) for key in keys],
+                return_exceptions=True,
+            )
+            return dict(zip(keys, results))
+
+    def project_result(self, result: Any, field_spec: Optional[dict]) -> Any:
+        # Field paths refer to a single resource, so they apply to each one of the batch
+        return {
+            key: {"error": str(value)} if isinstance(value, Exception) else self.tool.project_result(value, field_spec)
+            for key, value in result.items()
+        }
+
+    def is_cacheable(self, result: dict) -> bool:
+        # A failed lookup is retried by the next call, the others are in the response cache anyway
+        return not any(isinstance(value, Exception) for value in result.values())
+
+    def get_json_schema(self) -> dict[str, Any]:
+        if self._json_schema:
+            return self._json_schema
+
+        self._json_schema = {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": f"The {self.param} of every resource to fetch, IDs or names."
+                        }
+                    },
+                    "required": ["ids"],
+                    "additionalProperties": False
+                },
+                "strict": True
+            }
+        }
+        return self._json_schema
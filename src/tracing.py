@@ -0,0 +1,174 @@
+import contextvars
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Optional
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """
+    A timed operation, nested under the span that was current when it started.
+    Numeric attributes are summed per span name in Tracer.summary().
+    """
+    __slots__ = ("_tracer", "_token", "_started_at", "name", "trace_id", "span_id", "parent_id", "start_time", "duration", "attributes", "error")
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]):
+        parent = _current_span.get()
+        self._tracer = tracer
+        self._token = None
+        self._started_at = 0
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = 0
+        self.duration = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_time = time.time_ns()
+        self._started_at = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter_ns() - self._started_at
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self._tracer._finish(self)
+
+class _NoopSpan:
+    """Returned by a disabled tracer, so instrumented code pays a single method call per span."""
+    __slots__ = ()
+    recording = False
+
+    def set(self, **attributes: Any):
+        pass
+
+    def add(self, key: str, amount: float = 1):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Tracer:
+    """
+    Records spans in memory: the most recent `max_spans` in full for export, and running totals
+    per span name for the stats. Disabled tracers hand out NOOP_SPAN and record nothing.
+    """
+    def __init__(self, enabled: bool = False, max_spans: int = 10000, service_name: str = "pokedex"):
+        self.enabled = enabled
+        self.service_name = service_name
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._totals: dict[str, dict[str, float]] = {}
+        self._finished = 0
+        self._exported = 0
+
+    def span(self, name: str, **attributes: Any):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def current(self):
+        """The innermost active span, to add attributes from code that does not own it."""
+        return (_current_span.get() or NOOP_SPAN) if self.enabled else NOOP_SPAN
+
+    def clear(self):
+        self._spans.clear()
+        self._totals.clear()
+        self._exported = self._finished
+
+    def take_unexported(self) -> list[Span]:
+        """The spans finished since the previous call, for exporters that push incrementally."""
+        count = min(self._finished - self._exported, len(self._spans))
+        self._exported = self._finished
+        return list(self._spans)[len(self._spans) - count:]
+
+    def _finish(self, span: Span):
+        self._spans.append(span)
+        self._finished += 1
+        totals = self._totals.setdefault(span.name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        duration_ms = span.duration / 1e6
+        totals["count"] += 1
+        totals["errors"] += span.error is not None
+        totals["total_ms"] += duration_ms
+        totals["max_ms"] = max(totals["max_ms"], duration_ms)
+        for key, value in span.attributes.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[key] = totals.get(key, 0) + value
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Count, latency percentiles and summed numeric attributes (tokens, bytes, retries, cache hits...) per span name."""
+        durations: dict[str, list[float]] = {}
+        for span in self._spans:
+            durations.setdefault(span.name, []).append(span.duration / 1e6)
+
+        summary = {}
+        for name, totals in sorted(self._totals.items()):
+            latencies = sorted(durations.get(name, [])) or [0.0]
+            summary[name] = {
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()},
+                "mean_ms": round(totals["total_ms"] / totals["count"], 3),
+                "p50_ms": round(latencies[len(latencies) // 2], 3),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            }
+        return summary
+
+    def to_otlp(self, spans: Optional[list[Span]] = None) -> dict[str, Any]:
+        """The given or all retained spans in the OTLP/JSON trace format, as accepted by an OpenTelemetry collector's /v1/traces."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [_otlp_span(span) for span in (self._spans if spans is None else spans)],
+                }],
+            }]
+        }
+
+    def write_otlp_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_otlp(), f)
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.start_time + span.duration),
+        "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+    }
+    if span.parent_id:
+        otlp_span["parentSpanId"] = span.parent_id
+    return otlp_span
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+# Off until the runtime turns it on, so importing the agent or tools elsewhere costs nothing
+tracer = Tracer()
@@ -0,0 +1,222 @@
+"""
+Offline benchmark of PokemonAgent.run against the local stand-ins.
+
+Every scenario runs twice with a new agent: cold, on empty caches, and warm, after the
+first run filled the shared response cache. The metrics are compared against baselines.json,
+run with UPDATE_BENCHMARK_BASELINES=1 to record new baselines after an intended change.
+Wall times are only compared with --timing (make benchmark), the other metrics are deterministic.
+"""
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from stand_ins import StandIns, load_scenarios, prepare_cache_dir
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+UPDATE_BASELINES = os.getenv("UPDATE_BENCHMARK_BASELINES") == "1"
+# Where to write the measured results, e.g. to keep them as a CI artifact
+RESULTS_PATH = os.getenv("BENCHMARK_RESULTS_PATH")
+# BENCHMARK_PIPELINE_TOOL_CALLS=0 measures the same stand-ins without starting tool calls mid-stream
+PIPELINE_TOOL_CALLS = os.getenv("BENCHMARK_PIPELINE_TOOL_CALLS") != "0"
+
+# Roughly the ratio between the small step model and the large answer model
+LLM_LATENCY = {"gpt-4o-mini": 0.02, "gpt-4o": 0.05}
+# Per streamed chunk of 8 characters, so tool calls started mid-stream have some generation to overlap with
+LLM_CHUNK_LATENCY = 0.002
+WEB_LATENCY = 0.02
+# Wall time is noisy on shared CI runners, only a clear slowdown counts as a regression
+WALL_TIME_TOLERANCE = 1.5
+WALL_TIME_SLACK = 0.05
+PROMPT_TOKENS_TOLERANCE = 1.05
+
+SCENARIOS = load_scenarios()
+
+
+class NullConsole:
+    def info(self, message, style=None):
+        pass
+
+    def bot(self, message):
+        pass
+
+
+async def run_benchmark() -> dict[str, dict]:
+    stand_ins = StandIns(SCENARIOS, llm_latency=LLM_LATENCY, web_latency=WEB_LATENCY, llm_chunk_latency=LLM_CHUNK_LATENCY)
+    runtime = stand_ins.create_runtime()
+    results = {}
+    try:
+        # The first completion pays for importing the OpenAI parsing helpers, which is not what is measured here.
+        # The warm-up scenario uses a local tool only, so the caches stay cold.
+        warm_up = next(scenario for scenario in SCENARIOS if scenario["name"] == "type_matchups")
+        await runtime.create_agent(NullConsole()).run(warm_up["query"])
+
+        for scenario in SCENARIOS:
+            for phase in ("cold", "warm"):
+                agent = runtime.create_agent(NullConsole(), pipeline_tool_calls=PIPELINE_TOOL_CALLS)
+                cache_before = runtime.response_cache.stats()
+                web_requests_before = stand_ins.web.state.requests
+                prefetches_consumed_before = runtime.prefetcher.consumed if runtime.prefetcher else 0
+
+                started_at = time.perf_counter()
+                answer = await agent.run(scenario["query"])
+                wall_time = time.perf_counter() - started_at
+                # Prefetches still running belong to this scenario, not to the next one
+                if runtime.prefetcher:
+                    await runtime.prefetcher.join()
+
+                cache_after = runtime.response_cache.stats()
+                cache_hits = cache_after["hits"] - cache_before["hits"]
+                cache_lookups = cache_hits + cache_after["misses"] - cache_before["misses"]
+                results[f"{scenario['name']}/{phase}"] = {
+                    "answer": answer,
+                    "wall_time": round(wall_time, 3),
+                    "llm_calls": agent.llm_calls,
+                    "tool_calls": agent.tool_calls,
+                    "pipelined_tool_calls": sum(step["pipelined"] for step in agent.tool_steps),
+                    "prompt_tokens": sum(agent.prompt_tokens),
+                    "prompt_tokens_by_model": prompt_tokens_by_model(agent.llm_usage),
+                    "tool_cache_hits": agent.tool_cache_hits,
+                    "response_cache_hit_ratio": round(cache_hits / cache_lookups, 3) if cache_lookups else None,
+                    "web_requests": stand_ins.web.state.requests - web_requests_before,
+                    "prefetches_consumed": (runtime.prefetcher.consumed if runtime.prefetcher else 0) - prefetches_consumed_before,
+                }
+    finally:
+        await runtime.aclose()
+    return results
+
+
+def prompt_tokens_by_model(llm_usage: dict) -> dict[str, int]:
+    totals: dict[str, int] = {}
+    for models in llm_usage.values():
+        for model, usage in models.items():
+            totals[model] = totals.get(model, 0) + usage["prompt_tokens"]
+    return dict(sorted(totals.items()))
+
+
+def find_regressions(result: dict, baseline: dict) -> list[str]:
+    regressions = []
+    for metric in ("llm_calls", "tool_calls", "web_requests"):
+        if result[metric] > baseline[metric]:
+            regressions.append(f"{metric}: {result[metric]} > {baseline[metric]}")
+    for metric in ("tool_cache_hits", "prefetches_consumed", "pipelined_tool_calls"):
+        if result[metric] < baseline.get(metric, 0):
+            regressions.append(f"{metric}: {result[metric]} < {baseline[metric]}")
+    if (result["response_cache_hit_ratio"] or 0.0) < (baseline["response_cache_hit_ratio"] or 0.0):
+        regressions.append(
+            f"response_cache_hit_ratio: {result['response_cache_hit_ratio']} < {baseline['response_cache_hit_ratio']}"
+        )
+    if result["prompt_tokens"] > baseline["prompt_tokens"] * PROMPT_TOKENS_TOLERANCE:
+        regressions.append(f"prompt_tokens: {result['prompt_tokens']} > {baseline['prompt_tokens']}")
+    # Tokens moving from the large to the small model is the point of the model tiering
+    for model, tokens in result["prompt_tokens_by_model"].items():
+        baseline_tokens = baseline.get("prompt_tokens_by_model", {}).get(model)
+        if baseline_tokens is not None and tokens > baseline_tokens * PROMPT_TOKENS_TOLERANCE:
+            regressions.append(f"prompt_tokens_by_model[{model}]: {tokens} > {baseline_tokens}")
+    return regressions
+
+
+@pytest.fixture(scope="module")
+def benchmark_results():
+    prepare_cache_dir()
+    results = asyncio.run(run_benchmark())
+
+    for name, result in results.items():
+        metrics = ", ".join(f"{metric}={value}" for metric, value in result.items() if metric != "answer")
+        print(f"{name}: {metrics}")
+    if RESULTS_PATH:
+        with open(RESULTS_PATH, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if UPDATE_BASELINES:
+        baselines = {name: {k: v for k, v in result.items() if k != "answer"} for name, result in results.items()}
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(baselines, f, indent=2)
+            f.write("\n")
+    return results
+
+
+@pytest.fixture(scope="module")
+def baselines():
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[scenario["name"] for scenario in SCENARIOS])
+def test_scenario_answers(benchmark_results, scenario):
+    for phase in ("cold", "warm"):
+        assert benchmark_results[f"{scenario['name']}/{phase}"]["answer"] == scenario["steps"][-1]["final_answer"]
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[scenario["name"] for scenario in SCENARIOS])
+def test_scenario_matches_baseline(benchmark_results, baselines, scenario):
+    for phase in ("cold", "warm"):
+        name = f"{scenario['name']}/{phase}"
+        assert name in baselines, f"No baseline for {name}, run with UPDATE_BENCHMARK_BASELINES=1"
+        regressions = find_regressions(benchmark_results[name], baselines[name])
+        assert not regressions, f"{name} regressed: {'; '.join(regressions)}"
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[scenario["name"] for scenario in SCENARIOS])
+def test_scenario_wall_time_matches_baseline(benchmark_results, baselines, scenario):
+    for phase in ("cold", "warm"):
+        name = f"{scenario['name']}/{phase}"
+        wall_time, baseline = benchmark_results[name]["wall_time"], baselines[name]["wall_time"]
+        assert wall_time <= baseline * WALL_TIME_TOLERANCE + WALL_TIME_SLACK, (
+            f"{name} regressed: wall_time: {wall_time}s > {baseline}s"
+        )
+
+
+def test_warm_runs_are_served_from_the_response_cache(benchmark_results):
+    for scenario in SCENARIOS:
+        warm = benchmark_results[f"{scenario['name']}/warm"]
+        assert warm["response_cache_hit_ratio"] in (None, 1.0)
+        assert warm["web_requests"] == 0
+
+
+async def run_tool_steps(scenario: dict, pipeline_tool_calls: bool) -> list[dict]:
+    # Slow enough streaming and fetches that the overlap is well above the timer noise
+    stand_ins = StandIns(SCENARIOS, llm_chunk_latency=0.01, web_latency=0.05)
+    runtime = stand_ins.create_runtime()
+    try:
+        agent = runtime.create_agent(NullConsole(), pipeline_tool_calls=pipeline_tool_calls)
+        await agent.run(scenario["query"])
+        return agent.tool_steps
+    finally:
+        await runtime.aclose()
+
+
+def compare_tool_steps(name: str) -> list[tuple[dict, dict]]:
+    scenario = next(scenario for scenario in SCENARIOS if scenario["name"] == name)
+    prepare_cache_dir()
+    sequential = asyncio.run(run_tool_steps(scenario, pipeline_tool_calls=False))
+    prepare_cache_dir()
+    pipelined = asyncio.run(run_tool_steps(scenario, pipeline_tool_calls=True))
+    return list(zip(sequential, pipelined))
+
+
+@pytest.mark.parametrize("name", ["parallel_lookups", "repeated_lookup"])
+def test_tool_calls_are_started_while_the_completion_streams(name):
+    for before, after in compare_tool_steps(name):
+        assert before["pipelined"] == 0
+        assert before["overlap_ms"] == 0
+        assert after["pipelined"] == after["calls"]
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("name", ["parallel_lookups", "repeated_lookup"])
+def test_pipelined_tool_calls_overlap_the_completion(name):
+    for index, (before, after) in enumerate(compare_tool_steps(name)):
+        print(
+            f"{name} step {index}: waited {before['waited_ms']:.1f} ms -> {after['waited_ms']:.1f} ms, "
+            f"{after['overlap_ms']:.1f} ms of tool time during the completion "
+            f"({after['pipelined']}/{after['calls']} calls started while streaming)"
+        )
+        # Earlier calls run while the later ones are generated, a single call has nothing to overlap with
+        if after["calls"] > 1:
+            assert after["overlap_ms"] >= 10
+        # A step still waits for its last call, whose arguments end with the completion
+        assert after["waited_ms"] <= before["waited_ms"] + WALL_TIME_SLACK * 1000
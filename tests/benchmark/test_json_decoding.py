@@ -0,0 +1,202 @@
+"""
+Benchmark of the selective JSON decoding of PokeAPI resources against the full decode it replaced,
+json.loads followed by projection.project: parse time, peak allocations and the RSS of a process
+holding many decoded results, as the agent's memoized tool results do.
+
+The recorded fixtures are trimmed, a full size /pokemon resource is rebuilt from one of them:
+real ones list every move with its learn method per version group and weigh 300-500 KB.
+"""
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from stand_ins import FIXTURES_DIR
+from tools.projection import compile_field_spec, project
+from tools.selective_json import Record, decode_selected, to_builtin
+
+API_URL = "https://pokeapi.co/api/v2"
+REPEATS = 20
+RETAINED_RESULTS = 200
+
+FIELD_PATHS = [
+    ["types[*].type.name"],
+    ["name", "stats[*].stat.name", "stats[*].base_stat"],
+    ["abilities[*].ability.name", "abilities[*].is_hidden"],
+    ["species", "id"],
+    ["moves[*].move.name"],
+    ["moves[0]", "sprites.front_default"],
+    ["unknown_field"],
+]
+
+RSS_SCRIPT = """
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+from tools.projection import compile_field_spec, project
+from tools.selective_json import decode_selected
+
+body = open(sys.argv[2], "rb").read()
+spec = compile_field_spec(["types[*].type.name", "stats[*].base_stat"])
+if sys.argv[3] == "selective":
+    results = [decode_selected(body, spec, "pokemon_retrieve") for _ in range(int(sys.argv[4]))]
+else:
+    # The agent memoized the whole decoded resource and projected it when formatting the observation
+    results = [json.loads(body) for _ in range(int(sys.argv[4]))]
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def ref(kind: str, name: str, resource_id: int) -> dict:
+    return {"name": name, "url": f"{API_URL}/{kind}/{resource_id}/"}
+
+
+def full_size_pokemon() -> bytes:
+    rng = random.Random(6)
+    with open(FIXTURES_DIR / "pokeapi" / "pokemon" / "6.json") as f:
+        pokemon = json.load(f)
+
+    version_groups = [ref("version-group", f"version-group-{i}", i) for i in range(1, 28)]
+    pokemon["moves"] = [
+        {
+            "move": ref("move", f"move-{move_id}", move_id),
+            "version_group_details": [
+                {
+                    "level_learned_at": rng.randint(0, 60),
+                    "move_learn_method": ref("move-learn-method", "level-up", 1),
+                    "order": None,
+                    "version_group": version_group,
+                }
+                for version_group in rng.sample(version_groups, rng.randint(5, 25))
+            ],
+        }
+        for move_id in range(1, 120)
+    ]
+    pokemon["game_indices"] = [
+        {"game_index": pokemon["id"], "version": ref("version", f"version-{i}", i)} for i in range(1, 21)
+    ]
+    pokemon["sprites"]["other"] = {
+        f"artwork-{i}": {"front_default": f"https://raw.githubusercontent.com/PokeAPI/sprites/master/{i}/6.png"}
+        for i in range(30)
+    }
+    return json.dumps(pokemon).encode()
+
+
+def best_time(function, repeats: int = REPEATS) -> float:
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def peak_allocations(function) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def retained_rss_kb(body_path: Path, mode: str) -> int:
+    src = Path(__file__).parents[2] / "src"
+    output = subprocess.run(
+        [sys.executable, "-c", RSS_SCRIPT, str(src), str(body_path), mode, str(RETAINED_RESULTS)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return int(output)
+
+
+@pytest.fixture(scope="module")
+def body() -> bytes:
+    return full_size_pokemon()
+
+
+@pytest.mark.parametrize("paths", FIELD_PATHS, ids=[",".join(paths) for paths in FIELD_PATHS])
+def test_selective_decoding_matches_projection(body, paths):
+    spec = compile_field_spec(paths)
+    resources = [body, *(path.read_bytes() for path in (FIXTURES_DIR / "pokeapi").glob("*/*.json"))]
+
+    for resource in resources:
+        assert to_builtin(decode_selected(resource, spec)) == project(json.loads(resource), spec)
+
+
+def test_selective_decoding_returns_records(body):
+    record = decode_selected(body, compile_field_spec(["name", "types[*].type.name"]), "pokemon_retrieve")
+
+    assert isinstance(record, Record)
+    assert type(record).__name__ == "PokemonRetrieveRecord"
+    assert not hasattr(record, "__dict__")
+    assert record.name == "charizard"
+    assert record.types == [{"type": {"name": "fire"}}, {"type": {"name": "flying"}}]
+
+
+def test_brackets_inside_skipped_strings_do_not_break_decoding():
+    body = b'{"effect": "Has a 10% chance to [paralyze]{mechanic:paralysis}", "flavor": ["]"], "id": 9}'
+
+    assert decode_selected(body, {"id": {}}).to_dict() == {"id": 9}
+
+
+@pytest.mark.parametrize("body", [
+    '{"a": ["["], "id": 5, "b": ["]"]}',
+    '{"a": {"k": "}"}, "id": 5, "b": {"k": "{"}}',
+    '{"a": ["\\\\\\"[", "x"], "id": 5, "b": ["\\"]\\\\"]}',
+    '{"a": [{"k": "\\"}"}, "]\\\\"], "id": 5, "b": ["{[\\"", {"k": "]"}]}',
+])
+def test_skipped_strings_with_brackets_and_escaped_quotes_are_decoded_exactly(body):
+    assert decode_selected(body, {"id": {}}).to_dict() == {"id": 5}
+
+
+def test_skipping_matches_projection_on_random_documents():
+    rng = random.Random(21)
+    pieces = ["[", "]", "{", "}", '"', "\\", ",", ":", "a"]
+
+    def value(depth: int):
+        kind = rng.randrange(4 if depth < 4 else 2)
+        if kind == 0:
+            return "".join(rng.choices(pieces, k=rng.randint(0, 6)))
+        if kind == 1:
+            return rng.randint(0, 9)
+        if kind == 2:
+            return [value(depth + 1) for _ in range(rng.randint(0, 3))]
+        return {"".join(rng.choices(pieces, k=3)): value(depth + 1) for _ in range(rng.randint(0, 3))}
+
+    for _ in range(500):
+        document = {"a": value(0), "id": value(0), "b": value(0)}
+        body = json.dumps(document)
+        assert to_builtin(decode_selected(body, {"id": {}})) == {"id": document["id"]}
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("paths", FIELD_PATHS[:4], ids=[",".join(paths) for paths in FIELD_PATHS[:4]])
+def test_selective_decoding_is_faster(body, paths):
+    spec = compile_field_spec(paths)
+    selective_time = best_time(lambda: decode_selected(body, spec))
+    full_time = best_time(lambda: project(json.loads(body), spec))
+    print(f"{','.join(paths)}: {len(body) // 1024} KB, parse {selective_time * 1000:.2f} ms vs {full_time * 1000:.2f} ms")
+    assert selective_time < full_time
+
+
+@pytest.mark.parametrize("paths", FIELD_PATHS[:4], ids=[",".join(paths) for paths in FIELD_PATHS[:4]])
+def test_selective_decoding_allocates_less(body, paths):
+    spec = compile_field_spec(paths)
+    selective_peak = peak_allocations(lambda: decode_selected(body, spec))
+    full_peak = peak_allocations(lambda: project(json.loads(body), spec))
+    print(f"{','.join(paths)}: {len(body) // 1024} KB, peak {selective_peak // 1024} KB vs {full_peak // 1024} KB")
+    # The selective peak is mostly the decoded text of the body itself
+    assert selective_peak < full_peak / 2
+
+
+def test_retained_results_take_less_memory(body, tmp_path):
+    body_path = tmp_path / "pokemon.json"
+    body_path.write_bytes(body)
+
+    selective_rss, full_rss = retained_rss_kb(body_path, "selective"), retained_rss_kb(body_path, "full")
+    print(f"{RETAINED_RESULTS} retained results: peak RSS {selective_rss // 1024} MB vs {full_rss // 1024} MB")
+    assert selective_rss < full_rss / 2
@@ -1,7 +1,21 @@
+import os
+import sys
+import tempfile
 from pathlib import Path
 
+import pytest
 from dotenv import load_dotenv
 
+# The application modules import each other as top level modules, like when running src/main.py
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--timing", action="store_true",
+        help="Also run the wall time checks marked with @pytest.mark.timing, e.g. on an idle machine via make benchmark",
+    )
+
 
 def pytest_configure(config):
     """
@@ -16,8 +30,28 @@ def pytest_configure(config):
         raise RuntimeError(
             f"Failed to load test environment variables from {test_env_path}"
         )
+    # Compiled tools, the dataset and the response cache must never leak between test runs or into ~/.cache
+    os.environ["POKEDEX_CACHE_DIR"] = tempfile.mkdtemp(prefix="pokedex-tests-")
     print(f"Test environment loaded from {test_env_path}")
     print("--------------------------------------------------\n")
+    config.addinivalue_line("markers", "timing: wall time check, only run with --timing")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Wall times fail under CPU contention, the default run only gates calls, tokens, cache hits and memory
+    if config.getoption("--timing"):
+        return
+    skip_timing = pytest.mark.skip(reason="wall time check, run with --timing or make benchmark")
+    for item in items:
+        if "timing" in item.keywords:
+            item.add_marker(skip_timing)
+
+
 
+@pytest.fixture
+def stand_ins():
+    """Zero latency OpenAI, PokeAPI and Smogon stand-ins over freshly prepared caches."""
+    from stand_ins import StandIns, prepare_cache_dir
 
-# You can add more configuration or fixtures here if needed
+    prepare_cache_dir()
+    return StandIns()
@@ -0,0 +1,193 @@
+import asyncio
+
+from stand_ins import StandIns, load_scenarios, prepare_cache_dir
+
+
+class NullConsole:
+    def info(self, message, style=None):
+        pass
+
+    def bot(self, message):
+        pass
+
+
+def run_query(stand_ins, query: str, max_steps: int = 10, **options):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            agent = runtime.create_agent(NullConsole(), **options)
+            answer = await agent.run(query, max_steps=max_steps)
+            return agent, answer
+        finally:
+            await runtime.aclose()
+
+    return asyncio.run(run())
+
+
+def test_steps_run_on_the_step_model_and_the_answer_on_the_answer_model(stand_ins):
+    agent, answer = run_query(stand_ins, "What type is Charizard?", step_model="small", answer_model="large")
+
+    assert answer == "Charizard is a Fire/Flying type Pokémon."
+    assert agent.llm_usage.keys() == {"step", "answer"}
+    assert agent.llm_usage["step"].keys() == {"small"}
+    # The step model hands off along with its tool calls, the answer is not drafted twice
+    assert agent.llm_calls == 2
+    assert agent.llm_usage["step"]["small"]["calls"] == 1
+    assert agent.llm_usage["answer"].keys() == {"large"}
+    assert agent.llm_usage["answer"]["large"]["calls"] == 1
+    assert agent.llm_usage["answer"]["large"]["prompt_tokens"] > 0
+
+
+def test_an_answer_drafted_by_the_step_model_is_answered_again_by_the_answer_model():
+    prepare_cache_dir()
+    scenario = next(scenario for scenario in load_scenarios() if scenario["name"] == "single_lookup")
+    # A step model that answers instead of handing off
+    del scenario["steps"][0]["ready_to_answer"]
+
+    agent, answer = run_query(
+        StandIns([scenario]), scenario["query"], step_model="small", answer_model="large",
+    )
+
+    assert answer == "Charizard is a Fire/Flying type Pokémon."
+    assert agent.llm_usage["step"]["small"]["calls"] == 2
+    assert agent.llm_usage["answer"]["large"]["calls"] == 1
+
+
+def test_one_model_for_every_phase_needs_no_extra_answer_completion(stand_ins):
+    agent, answer = run_query(stand_ins, "What type is Charizard?", step_model="large", answer_model="large")
+
+    assert answer == "Charizard is a Fire/Flying type Pokémon."
+    assert agent.llm_calls == 2
+    assert agent.llm_usage["answer"]["large"]["calls"] == 1
+
+
+def test_repeated_failures_escalate_to_the_answer_model(stand_ins):
+    # The OpenAI stand-in rejects queries it has no script for
+    agent, answer = run_query(
+        stand_ins, "This query is not scripted", max_steps=1,
+        step_model="small", answer_model="large", escalate_after_failures=2,
+    )
+
+    assert answer == "Sorry, I couldn't find an answer for that."
+    assert agent.llm_usage["step"]["small"]["calls"] == 2
+    assert agent.llm_usage["step"]["large"]["calls"] == 1
+    assert agent.llm_usage["answer"].keys() == {"large"}
+
+
+def test_other_fields_of_a_memoized_resource_are_a_memo_hit(stand_ins):
+    agent, _ = run_query(stand_ins, "What is Pikachu's genus, and what are its abilities?")
+
+    assert agent.tool_calls == 3
+    assert agent.tool_cache_hits == 1
+    observations = [message["content"] for message in agent._memory.messages() if message["content"].startswith("Tool used")]
+    # The second step still only sees the fields it asked for
+    assert '"static"' in observations[-1] and "genera" not in observations[-1]
+
+
+def test_fields_holding_only_a_link_keep_it():
+    prepare_cache_dir()
+    scenario = {
+        "name": "evolution_chain_link",
+        "query": "Where is Garchomp's evolution chain?",
+        "steps": [
+            {
+                "thought": "The species links to the evolution chain.",
+                "tool_fields": ["evolution_chain", "generation"],
+                "tool_calls": [{"name": "pokemon_species_retrieve", "arguments": {"id": "445"}}],
+                "ready_to_answer": True,
+            },
+            {"final_answer": "It is evolution chain 445."},
+        ],
+    }
+
+    agent, _ = run_query(StandIns([scenario]), scenario["query"])
+
+    (observation,) = [message["content"] for message in agent._memory.messages() if message["content"].startswith("Tool used")]
+    assert '"evolution_chain":{"url":"https://pokeapi.co/api/v2/evolution-chain/445/"}' in observation
+    # Named resources still lose their link
+    assert '"generation":{"name":"generation-iv"}' in observation
+
+
+def test_duplicated_tool_calls_are_not_counted_as_failures():
+    prepare_cache_dir()
+    scenario = {
+        "name": "duplicated_call",
+        "query": "What type is Charizard, really?",
+        "steps": [
+            {
+                "thought": "I should fetch Charizard's types.",
+                "tool_fields": ["types[*].type.name"],
+                "tool_calls": [
+                    {"name": "pokemon_retrieve", "arguments": {"id": "6"}},
+                    {"name": "pokemon_retrieve", "arguments": {"id": "6"}},
+                ],
+                "ready_to_answer": True,
+            },
+            {"final_answer": "Charizard is a Fire/Flying type Pokémon."},
+        ],
+    }
+
+    agent, answer = run_query(StandIns([scenario]), scenario["query"], reflection_policy="auto")
+
+    assert answer == "Charizard is a Fire/Flying type Pokémon."
+    assert agent._failures == 0
+    assert "reflection" not in agent.llm_usage
+    assert agent.llm_calls == 2
+
+
+def test_unavailable_tools_are_called_again_once_available(stand_ins, monkeypatch):
+    from tools import pokedex_dataset
+
+    scenario = next(scenario for scenario in load_scenarios() if scenario["name"] == "dataset_query")
+
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            agent = runtime.create_agent(NullConsole())
+            with monkeypatch.context() as patch:
+                # The dataset is still being built
+                patch.setattr(pokedex_dataset, "_dataset", None)
+                patch.setattr(pokedex_dataset.PokedexDataset, "load", classmethod(lambda cls, *args: None))
+                await agent.run(scenario["query"])
+            await agent.run(scenario["query"])
+            return agent
+        finally:
+            await runtime.aclose()
+
+    agent = asyncio.run(run())
+
+    observations = [message["content"] for message in agent._memory.messages() if message["content"].startswith("Tool used")]
+    assert "not available yet" in observations[0]
+    assert "garchomp" in observations[1]
+    assert agent.tool_cache_hits == 0
+    assert agent._failures == 0
+
+
+def test_batches_with_failed_lookups_are_not_memoized(stand_ins):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            tool = next(tool for tool in runtime.tools if tool.name == "pokemon_retrieve_batch")
+            return tool.is_cacheable(await tool.fetch(ids=["6", "missingno"])), tool.is_cacheable(await tool.fetch(ids=["6"]))
+        finally:
+            await runtime.aclose()
+
+    assert asyncio.run(run()) == (False, True)
+
+
+def test_each_phase_runs_on_its_model(stand_ins):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            return runtime.create_agent(NullConsole(), step_model="small", answer_model="large", escalate_after_failures=2)
+        finally:
+            await runtime.aclose()
+
+    agent = asyncio.run(run())
+
+    assert [agent._select_model(phase) for phase in ("step", "reflection", "answer")] == ["small", "small", "large"]
+    agent._failures = 1
+    assert agent._select_model("step") == "small"
+    # Escalated after repeated failures, until a step succeeds again
+    agent._failures = 2
+    assert [agent._select_model(phase) for phase in ("step", "reflection", "answer")] == ["large", "large", "large"]
@@ -0,0 +1,30 @@
+import asyncio
+import io
+import json
+
+from batch import read_queries, run_batch
+
+
+def test_items_without_a_query_are_reported_in_place(stand_ins):
+    queries = read_queries([
+        '{"id": "a", "query": "What type is Charizard?"}',
+        '{"id": "b", "question": "What type is Pikachu?"}',
+        '{"id": "c", "query": ""}',
+    ])
+    output = io.StringIO()
+
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            return await run_batch(runtime, queries, output)
+        finally:
+            await runtime.aclose()
+
+    summary = asyncio.run(run())
+    results = {result["id"]: result for result in map(json.loads, output.getvalue().splitlines())}
+
+    assert summary["queries"] == 3
+    assert summary["errors"] == 2
+    assert results["a"]["answer"] == "Charizard is a Fire/Flying type Pokémon."
+    assert results["b"] == {"id": "b", "query": None, "error": "Missing query"}
+    assert results["c"] == {"id": "c", "query": "", "error": "Missing query"}
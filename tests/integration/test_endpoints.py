@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server import create_application
+
+
+@pytest.fixture
+def client(stand_ins):
+    with TestClient(create_application(runtime_factory=stand_ins.create_runtime)) as client:
+        yield client
+
+
+def read_events(response) -> list[tuple[str, object]]:
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_health(client):
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "sessions": 0}
+
+
+def test_chat_answers_with_tool_calls(client, stand_ins):
+    response = client.post("/chat", json={"message": "What type is Charizard?"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Charizard is a Fire/Flying type Pokémon."
+    # The step model calls the tool and hands off, the answer model writes the answer
+    assert stand_ins.openai.state.requests == 2
+    assert stand_ins.web.state.requests >= 1
+
+
+def test_chat_keeps_the_session(client):
+    first = client.post("/chat", json={"message": "What type is Charizard?"}).json()
+    second = client.post(
+        "/chat",
+        json={"message": "Who is faster, Dragonite or Garchomp?", "session_id": first["session_id"]},
+    ).json()
+
+    assert second["session_id"] == first["session_id"]
+    assert second["answer"].startswith("Garchomp is faster")
+    assert client.get("/health").json()["sessions"] == 1
+
+
+def test_chat_stream_emits_trace_and_answer_tokens(client):
+    with client.stream("POST", "/chat/stream", json={"message": "What type is Charizard?"}) as response:
+        response.read()
+
+    assert response.status_code == 200
+    events = read_events(response)
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "session"
+    assert "thought" in kinds
+    assert "action" in kinds
+    assert kinds[-1] == "answer"
+    answer = events[-1][1]
+    assert answer == "Charizard is a Fire/Flying type Pokémon."
+    assert "".join(data for kind, data in events if kind == "token") == answer
+
+
+def test_unknown_query_falls_back_to_apology(client):
+    response = client.post("/chat", json={"message": "This query is not scripted"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Sorry, I couldn't find an answer for that."
+
+
+def test_delete_session(client):
+    session_id = client.post("/chat", json={"message": "What type is Charizard?"}).json()["session_id"]
+
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.delete(f"/sessions/{session_id}").status_code == 404
+    assert client.get("/health").json()["sessions"] == 0
+
+
+def test_stats_report_the_shared_caches(client):
+    client.post("/chat", json={"message": "What type is Charizard?"})
+    client.post("/chat", json={"message": "What type is Charizard?"})
+
+    stats = client.get("/stats").json()
+    assert stats["sessions"] == 2
+    assert stats["response_cache"]["misses"] == 1
+    assert stats["response_cache"]["hits"] == 1
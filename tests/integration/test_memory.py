@@ -0,0 +1,70 @@
+from memory import ConversationMemory
+from tokens import estimate_tokens
+
+OBSERVATION = "Tool used: pokemon_retrieve\nResult: " + "charizard fire flying " * 100
+
+
+def kinds(memory: ConversationMemory) -> list[str]:
+    return [entry["kind"] for entry in memory._entries]
+
+
+def test_history_within_the_budget_is_kept_as_it_is():
+    memory = ConversationMemory("system", max_tokens=10_000)
+    memory.append("user", "What type is Charizard?", "query")
+    memory.append("assistant", OBSERVATION, "observation")
+
+    assert memory.messages()[-1]["content"] == OBSERVATION
+    assert (memory.compacted, memory.evicted) == (0, 0)
+
+
+def test_old_observations_are_compacted_before_anything_is_evicted():
+    memory = ConversationMemory("system", max_tokens=3 * estimate_tokens(OBSERVATION), pinned_recent_messages=2)
+    memory.append("user", "Compare Charizard, Dragonite and Garchomp.", "query")
+    for _ in range(4):
+        memory.append("assistant", OBSERVATION, "observation")
+
+    observations = [entry for entry in memory._entries if entry["kind"] == "observation"]
+    assert memory.evicted == 0
+    assert memory.total_tokens <= memory.max_tokens
+    # The oldest are compacted to an excerpt, the recent ones are pinned in full
+    assert observations[0]["compacted"] and observations[0]["tokens"] <= 60 + estimate_tokens("…[truncated 10000 tokens]")
+    assert [entry["content"] for entry in observations[-2:]] == [OBSERVATION, OBSERVATION]
+    assert memory.total_tokens == sum(entry["tokens"] for entry in memory._entries)
+
+
+def test_oldest_messages_are_evicted_errors_first_keeping_the_system_prompt_and_query():
+    thought = "I should look this up. " * 20
+    error = "Error: pokemon_retrieve timed out after 10s"
+    history = [
+        ("user", "Old question?", "query"),
+        ("assistant", thought, "thought"),
+        ("assistant", error, "error"),
+        ("user", "Which generation was Garchomp introduced in?", "query"),
+        *[("assistant", thought, "thought")] * 4,
+    ]
+    # Room for everything but the error
+    budget = sum(estimate_tokens(content) for _, content, _ in history) - estimate_tokens(error) + estimate_tokens("system")
+    memory = ConversationMemory("system", max_tokens=budget, pinned_recent_messages=2)
+    for message in history:
+        memory.append(*message)
+
+    assert kinds(memory) == ["system", "query", "thought", "query", "thought", "thought", "thought", "thought"]
+    assert memory.evicted == 1
+
+    memory.append("assistant", thought, "thought")
+
+    # Then the oldest ones, but never the system prompt or the latest query
+    assert kinds(memory) == ["system", "query", "thought", "thought", "thought", "thought", "thought"]
+    assert memory.evicted == 3
+    memory.max_tokens = 0
+    memory.append("assistant", thought, "thought")
+    assert kinds(memory) == ["system", "query", "thought", "thought"]
+
+
+def test_pinned_messages_are_kept_even_over_the_budget():
+    memory = ConversationMemory("system", max_tokens=10, pinned_recent_messages=2)
+    memory.append("user", "What type is Charizard?", "query")
+    memory.append("assistant", OBSERVATION, "observation")
+
+    assert kinds(memory) == ["system", "query", "observation"]
+    assert memory.stats()["tokens"] > memory.max_tokens
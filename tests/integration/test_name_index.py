@@ -0,0 +1,109 @@
+import asyncio
+import json
+import random
+import string
+import time
+
+import pytest
+
+from stand_ins import FIXTURES_DIR
+from tools.name_index import NameIndex, build_name_index, get_name_index, resolve_pokeapi_names
+
+
+@pytest.fixture
+def index() -> NameIndex:
+    with open(FIXTURES_DIR / "names.json") as f:
+        return NameIndex(json.load(f))
+
+
+@pytest.mark.parametrize("kind, name, expected", [
+    ("pokemon", "charizard", 6),
+    ("pokemon", "Mr. Mime", 122),
+    ("pokemon", "mr mime", 122),
+    ("pokemon", "garchomb", 445),
+    ("pokemon-species", "charzard", 6),
+    ("ability", "Rough Skin", 24),
+    ("type", "Fire", 10),
+])
+def test_names_resolve_to_ids(index, kind, name, expected):
+    assert index.resolve(kind, name).id == expected
+
+
+def test_unrelated_names_are_not_resolved(index):
+    assert index.resolve("pokemon", "missingno") is None
+    assert index.resolve("item", "potion") is None
+
+
+@pytest.mark.parametrize("kind, name", [
+    # urshifu-rapid-strike, closely followed by urshifu-rapid-strike-gmax
+    ("pokemon", "urshifu rapid"),
+    # thunderbolt or thunder
+    ("move", "thunderbot"),
+    # charizard-mega-x and charizard-mega-y match equally
+    ("pokemon", "charizard mega"),
+])
+def test_ambiguous_names_are_not_resolved(index, kind, name):
+    assert index.resolve(kind, name) is None
+
+
+@pytest.mark.timing
+def test_lookups_take_microseconds():
+    rng = random.Random(25)
+    names = list({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(3000)})
+    index = NameIndex({"pokemon": [(name, resource_id) for resource_id, name in enumerate(names, 1)]})
+    # One letter dropped from each name
+    queries = [name[:2] + name[3:] for name in rng.sample(names, 500)]
+
+    started_at = time.perf_counter()
+    for query in queries:
+        index.resolve("pokemon", query)
+    elapsed = (time.perf_counter() - started_at) / len(queries)
+
+    print(f"{elapsed * 1e6:.0f} µs per misspelled lookup over {len(names)} names")
+    assert elapsed < 500e-6
+
+
+def test_misspelled_names_reach_the_resource(stand_ins):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            tool = next(tool for tool in runtime.tools if tool.name == "pokemon_retrieve")
+            return await tool.invoke(id="Charzard")
+        finally:
+            await runtime.aclose()
+
+    assert asyncio.run(run())["name"] == "charizard"
+
+
+def test_ambiguous_names_are_passed_on_as_they_are(stand_ins):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            tool = next(tool for tool in runtime.tools if tool.name == "pokemon_retrieve")
+            return tool._resolve_path_names({"id": "urshifu rapid"})
+        finally:
+            await runtime.aclose()
+
+    assert asyncio.run(run()) == {"id": "urshifu rapid"}
+
+
+def test_resolve_tool_lists_the_closest_matches(stand_ins):
+    results = resolve_pokeapi_names(["urshifu rapid", "blaze"], None)
+
+    assert results["urshifu rapid"][0] == {"kind": "pokemon", "name": "urshifu-rapid-strike", "id": 10191, "similarity": 0.727}
+    assert results["blaze"][0] == {"kind": "ability", "name": "blaze", "id": 66, "similarity": 1.0}
+
+
+def test_index_is_built_from_the_list_endpoints(stand_ins, index, tmp_path):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            return await build_name_index(runtime.http_client, runtime.response_cache, tmp_path / "names.json")
+        finally:
+            await runtime.aclose()
+
+    built = asyncio.run(run())
+
+    assert built.names == index.names
+    assert get_name_index() is built
+    assert NameIndex.load(tmp_path / "names.json").names == index.names
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from tools import pokeapi
+from tools.pokeapi import get_poke_api_tools, load_tool_artifact, refresh_poke_api_tools
+
+
+def test_first_start_uses_the_bundled_artifact(tmp_path):
+    # No client: a first start that fetched the spec would fail
+    tools = get_poke_api_tools(None, artifact_path=tmp_path / "pokeapi_tools.json")
+
+    names = {tool.name for tool in tools}
+    assert {"pokemon_retrieve", "pokemon_species_retrieve", "evolution_chain_retrieve", "pokemon_retrieve_batch"} <= names
+    assert not (tmp_path / "pokeapi_tools.json").exists()
+
+
+def test_refresh_compiles_the_spec_off_the_event_loop(stand_ins, tmp_path, monkeypatch):
+    artifact_path = tmp_path / "pokeapi_tools.json"
+    threads = []
+    compile_tool_artifact = pokeapi.compile_tool_artifact
+    monkeypatch.setattr(
+        pokeapi, "compile_tool_artifact",
+        lambda *args: threads.append(threading.current_thread()) or compile_tool_artifact(*args),
+    )
+
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            return await refresh_poke_api_tools(runtime.http_client, artifact_path)
+        finally:
+            await runtime.aclose()
+
+    assert asyncio.run(run())
+    assert threads and threads[0] is not threading.main_thread()
+    assert [tool["name"] for tool in load_tool_artifact(artifact_path)["tools"]] == [
+        "pokemon_retrieve", "pokemon_species_retrieve", "type_retrieve", "ability_retrieve",
+    ]
@@ -0,0 +1,30 @@
+import asyncio
+
+from tools.pokedex_dataset import DATASET_PATH, PokedexDataset, _build_lock, build_pokedex_dataset, query_pokedex
+
+
+def test_types_are_matched_case_insensitively(stand_ins):
+    result = query_pokedex(["Fire"], None, None, None, None, None)
+
+    assert [row["name"] for row in result] == ["charizard"]
+
+
+def test_unknown_types_are_reported(stand_ins):
+    result = query_pokedex(["fire", "sound"], None, None, None, None, None)
+
+    assert result.startswith("Unknown types: sound. Valid types are: ")
+
+
+def test_only_one_process_builds_the_dataset(tmp_path):
+    path = tmp_path / "pokedex.bin"
+
+    with _build_lock(path) as acquired:
+        # No client: a build that started fetching would fail
+        assert acquired
+        assert asyncio.run(build_pokedex_dataset(None, path=path)) is None
+
+
+def test_a_dataset_built_by_another_process_is_loaded(stand_ins):
+    dataset = asyncio.run(build_pokedex_dataset(None, path=DATASET_PATH))
+
+    assert len(dataset) == len(PokedexDataset.load(DATASET_PATH))
@@ -0,0 +1,41 @@
+import itertools
+
+import pytest
+
+from tools.pokemon_types import (
+    ALL_TYPES,
+    TYPE_CHART,
+    PokemonType,
+    get_attackers_against_defender,
+    get_effectiveness_multiplier,
+    get_matchups_against_defenders,
+)
+
+DEFENDERS = [[first.value] for first in ALL_TYPES] + [
+    [first.value, second.value] for first, second in itertools.combinations(ALL_TYPES, 2)
+]
+
+
+def chart_multiplier(attack_type: str, defender_types: list[str]) -> float:
+    # The multiplier as it was computed before the precomputed tables, straight from TYPE_CHART
+    effectiveness = 1.0
+    for defender in defender_types:
+        effectiveness *= TYPE_CHART.get(PokemonType(attack_type), {}).get(PokemonType(defender), 1.0)
+    return effectiveness
+
+
+@pytest.mark.parametrize("defender_types", DEFENDERS, ids=["/".join(types) for types in DEFENDERS])
+def test_tables_match_the_type_chart(defender_types):
+    expected = {attack_type.value: chart_multiplier(attack_type.value, defender_types) for attack_type in ALL_TYPES}
+
+    assert {attack_type: get_effectiveness_multiplier(attack_type, defender_types) for attack_type in expected} == expected
+    assert get_effectiveness_multiplier("fire", list(reversed(defender_types))) == expected["fire"]
+    grouped = get_attackers_against_defender(defender_types)
+    assert {attack_type: float(multiplier) for multiplier, types in grouped.items() for attack_type in types} == expected
+    (matchup,) = get_matchups_against_defenders(list(expected), [defender_types])
+    assert matchup["multipliers"] == expected
+    assert matchup["best_multiplier"] == max(expected.values())
+
+
+def test_matchups_need_an_attack_type():
+    assert get_matchups_against_defenders([], [["water"]]) == "attack_types must list at least one attack type."
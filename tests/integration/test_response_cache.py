@@ -0,0 +1,55 @@
+import asyncio
+import sqlite3
+import threading
+
+from tools.cache import ResponseCache
+
+URL = "https://pokeapi.co/api/v2/pokemon/6/"
+
+
+def test_disk_hits_are_loaded_off_the_event_loop(tmp_path):
+    path = tmp_path / "responses.sqlite"
+
+    async def fill():
+        cache = ResponseCache(path)
+        await cache.put(URL, b'{"id": 6}', etag='"v1"')
+        cache.close()
+
+    async def read():
+        cache = ResponseCache(path)
+        threads = []
+        load = cache._load
+        cache._load = lambda url: threads.append(threading.current_thread().name) or load(url)
+        try:
+            return await cache.get(URL), await cache.get(URL), cache.stats(), threads
+        finally:
+            cache.close()
+
+    asyncio.run(fill())
+    first, second, stats, threads = asyncio.run(read())
+
+    assert first.body == second.body == b'{"id": 6}'
+    assert first.etag == '"v1"'
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+    assert len(threads) == 1 and threads[0].startswith("response-cache")
+
+
+def test_access_times_of_disk_hits_are_written_in_a_batch(tmp_path):
+    path = tmp_path / "responses.sqlite"
+
+    async def run():
+        cache = ResponseCache(path)
+        await cache.put(URL, b"{}")
+        cache.close()
+
+        cache = ResponseCache(path)
+        await cache.get(URL)
+        stored_at, accessed_at = sqlite3.connect(str(path)).execute("SELECT stored_at, accessed_at FROM responses").fetchone()
+        # Only queued, the hit committed nothing
+        assert accessed_at == stored_at
+        cache.close()
+
+    asyncio.run(run())
+
+    stored_at, accessed_at = sqlite3.connect(str(path)).execute("SELECT stored_at, accessed_at FROM responses").fetchone()
+    assert accessed_at > stored_at
@@ -0,0 +1,107 @@
+import asyncio
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from tools.team_builder import GOAL_MASKS, TYPE_MASKS, TeamBuilder, TeamSearch, _popcount, find_best_team
+
+
+def type_search(team_size: int, goal: str) -> TeamSearch:
+    keys = sorted(TYPE_MASKS, key=lambda key: (_popcount(TYPE_MASKS[key][1]), key))
+    return TeamSearch.create(
+        [(TYPE_MASKS[key][0], _popcount(TYPE_MASKS[key][1])) for key in keys], team_size, GOAL_MASKS[goal],
+    )
+
+
+def exhaustive_best(search: TeamSearch) -> tuple[int, int]:
+    best = (-1, 0)
+    for team in itertools.combinations(range(len(search.coverage)), search.team_size):
+        covered = 0
+        for index in team:
+            covered |= search.coverage[index]
+        best = max(best, (_popcount(covered), -sum(search.weaknesses[index] for index in team)))
+    return best[0], -best[1]
+
+
+def find_coverage_team(stand_ins, **arguments):
+    async def run():
+        runtime = stand_ins.create_runtime()
+        try:
+            return await runtime.team_builder.find_coverage_team(**{
+                "team_size": None, "goal": None, "types_only": None,
+                "generation": None, "tier": None, "month": None, **arguments,
+            })
+        finally:
+            await runtime.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("goal", ["offense", "defense", "both"])
+def test_search_finds_the_exhaustive_optimum(goal):
+    search = type_search(2, goal)
+
+    covered, weaknesses, team = asyncio.run(find_best_team(search))
+
+    assert (covered, weaknesses) == exhaustive_best(search)
+    assert len(team) == 2
+
+
+def test_six_member_search_on_a_process_pool_matches_a_single_process():
+    search = type_search(6, "both")
+    single = asyncio.run(find_best_team(search))
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel = asyncio.run(find_best_team(search, executor, workers=2))
+
+    assert parallel[:2] == single[:2]
+    # Every type is hit super effectively and resisted
+    assert parallel[0] == 36
+
+
+@pytest.mark.timing
+def test_six_member_search_on_a_process_pool_is_well_under_a_second():
+    search = type_search(6, "both")
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        # The first search also pays for starting the worker processes
+        asyncio.run(find_best_team(search, executor, workers=2))
+        started_at = time.perf_counter()
+        asyncio.run(find_best_team(search, executor, workers=2))
+        elapsed = time.perf_counter() - started_at
+
+    print(f"6 member search over {len(search.coverage)} type combinations: {elapsed * 1000:.0f} ms")
+    assert elapsed < 0.5
+
+
+def test_types_only_team_covers_every_type(stand_ins):
+    result = find_coverage_team(stand_ins, types_only=True)
+
+    assert len(result["team"]) == 6
+    assert all("name" not in member for member in result["team"])
+    assert result["not_hit_super_effectively"] == []
+    assert result["unresisted"] == []
+    assert result["total_weaknesses"] == 10
+
+
+def test_pokemon_are_limited_to_the_generation(stand_ins):
+    result = find_coverage_team(stand_ins, generation=1, goal="defense")
+
+    # Garchomp, the fourth Pokémon of the local Pokédex fixture, was introduced in Generation 4
+    assert {member["name"] for member in result["team"]} == {"charizard", "pikachu", "dragonite"}
+    assert "not_hit_super_effectively" not in result
+
+
+def test_pokemon_are_limited_to_the_smogon_tier(stand_ins):
+    result = find_coverage_team(stand_ins, team_size=2, tier="ou", generation=9, month="2025-06")
+
+    assert len(result["team"]) == 2
+    assert {member["name"] for member in result["team"]} <= {"charizard", "pikachu", "dragonite", "garchomp"}
+
+
+def test_invalid_team_size_is_reported():
+    result = asyncio.run(TeamBuilder(smogon_stats=None).find_coverage_team(7, None, True, None, None, None))
+
+    assert result == "team_size must be between 1 and 6."
@@ -0,0 +1,40 @@
+import pytest
+
+from tools.pokeapi import get_poke_api_tools
+from tools.router import ToolRouter
+
+PINNED = ["pokemon_retrieve", "pokemon_species_retrieve"]
+
+
+@pytest.fixture(scope="module")
+def tools(tmp_path_factory):
+    # The bundled artifact lists every PokeAPI endpoint, like the registry of a real runtime
+    return get_poke_api_tools(None, artifact_path=tmp_path_factory.mktemp("tools") / "pokeapi_tools.json")
+
+
+def names(tools) -> list[str]:
+    return [tool.name for tool in tools]
+
+
+def test_relevant_tools_are_selected_along_with_the_pinned_ones(tools):
+    selected = names(ToolRouter(tools, top_k=4, pinned=PINNED).select("What does Eevee evolve into? Show its evolution chain."))
+
+    assert set(PINNED) <= set(selected)
+    assert "evolution_chain_retrieve" in selected
+    assert len(selected) <= len(PINNED) + 4
+    # Same order for the same selection, so the prompt prefix stays cacheable
+    assert selected == sorted(selected)
+
+
+def test_a_query_matching_no_tool_selects_only_the_pinned_ones(tools):
+    assert names(ToolRouter(tools, top_k=4, pinned=PINNED).select("Hello there!")) == PINNED
+
+
+def test_identical_selections_send_identical_schemas(tools):
+    router = ToolRouter(tools, top_k=4, pinned=PINNED)
+    first = [tool.get_json_schema() for tool in router.select("Which moves does Garchomp learn?")]
+    second = [tool.get_json_schema() for tool in router.select("Which moves does Garchomp learn?")]
+
+    assert first == second
+    # Built once per tool, not per query
+    assert all(a is b for a, b in zip(first, second))
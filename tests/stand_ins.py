@@ -0,0 +1,306 @@
+"""
+Local stand-ins for the OpenAI, PokeAPI and Smogon servers, so the agent can be tested and benchmarked offline.
+
+The stand-ins are ASGI applications. Tests mount them in process through httpx.ASGITransport,
+they can also be served on their own, e.g. `uvicorn --factory stand_ins:create_openai_stand_in`.
+"""
+import asyncio
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional, Union
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+# Fixture files never change during a run, so they all share one Last-Modified date
+FIXTURES_LAST_MODIFIED = "Sun, 01 Jun 2025 00:00:00 GMT"
+
+def load_scenarios(path: Path = FIXTURES_DIR / "scenarios.json") -> list[dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)
+
+def count_prompt_tokens(body: dict[str, Any]) -> int:
+    # Deliberately not tiktoken: the count must not depend on which optional packages are installed
+    return len(json.dumps(body.get("messages", []), ensure_ascii=False) + json.dumps(body.get("tools", []), ensure_ascii=False)) // 4
+
+def create_openai_stand_in(
+    scenarios: Optional[list[dict[str, Any]]] = None,
+    latency: Union[float, dict[str, float]] = 0.0,
+    chunk_latency: float = 0.0,
+) -> FastAPI:
+    """
+    Replays the scripted completions of each scenario. The scenario is picked by the last user message,
+    the step by the number of assistant messages (thoughts, observations and errors) that follow it.
+    `latency` is the time to the first chunk, either the same for every model or given per model to tell
+    small and large models apart. Streamed completions then take `chunk_latency` per content or arguments chunk.
+    """
+    scripts = {scenario["query"]: scenario["steps"] for scenario in scenarios or load_scenarios()}
+    app = FastAPI(title="OpenAI stand-in")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        messages = body["messages"]
+        query_index = max(index for index, message in enumerate(messages) if message["role"] == "user")
+        steps = scripts.get(messages[query_index]["content"])
+        if steps is None:
+            return JSONResponse(
+                {"error": {"message": "No scripted completion for this query", "type": "invalid_request_error"}},
+                status_code=400,
+            )
+
+        step_index = sum(1 for message in messages[query_index + 1:] if message["role"] == "assistant")
+        step = steps[min(step_index, len(steps) - 1)]
+        content = json.dumps({
+            "thought": step.get("thought"),
+            "final_answer": step.get("final_answer"),
+            "tool_fields": step.get("tool_fields"),
+            "ready_to_answer": step.get("ready_to_answer"),
+        }, ensure_ascii=False)
+        tool_calls = [
+            {
+                "id": f"call_{step_index}_{index}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }
+            for index, call in enumerate(step.get("tool_calls", []))
+        ]
+        usage = {"prompt_tokens": count_prompt_tokens(body), "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        model = body["model"]
+        await asyncio.sleep(latency.get(model, 0.0) if isinstance(latency, dict) else latency)
+        if body.get("stream"):
+            return StreamingResponse(
+                _completion_chunks(model, content, tool_calls, usage, chunk_latency), media_type="text/event-stream"
+            )
+
+        message = {"role": "assistant", "content": content, "tool_calls": tool_calls or None}
+        return {
+            **_completion_base("chat.completion", model),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage,
+        }
+
+    return app
+
+def _completion_base(kind: str, model: str) -> dict[str, Any]:
+    return {"id": "chatcmpl-stand-in", "object": kind, "created": 0, "model": model}
+
+async def _completion_chunks(
+    model: str,
+    content: str,
+    tool_calls: list[dict],
+    usage: dict,
+    chunk_latency: float = 0.0,
+) -> AsyncIterator[str]:
+    async def chunk(delta: dict, finish_reason: Optional[str] = None) -> str:
+        if chunk_latency and delta:
+            await asyncio.sleep(chunk_latency)
+        choice = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+        return f"data: {json.dumps({**_completion_base('chat.completion.chunk', model), 'choices': [choice]})}\n\n"
+
+    yield await chunk({"role": "assistant", "content": ""})
+    # Roughly token sized deltas, so streaming consumers see many small events like with the real API
+    for start in range(0, len(content), 8):
+        yield await chunk({"content": content[start:start + 8]})
+    for index, tool_call in enumerate(tool_calls):
+        yield await chunk({"tool_calls": [{
+            "index": index, "id": tool_call["id"], "type": "function",
+            "function": {"name": tool_call["function"]["name"], "arguments": ""},
+        }]})
+        arguments = tool_call["function"]["arguments"]
+        for start in range(0, len(arguments), 8):
+            yield await chunk({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + 8]}}]})
+    yield await chunk({}, "tool_calls" if tool_calls else "stop")
+    yield f"data: {json.dumps({**_completion_base('chat.completion.chunk', model), 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+def create_web_stand_in(fixtures_dir: Path = FIXTURES_DIR, latency: float = 0.0) -> FastAPI:
+    """
+    Serves the recorded PokeAPI resources, the Smogon usage files and the OpenAPI spec,
+    with ETag and Last-Modified validators like the real servers.
+    """
+    app = FastAPI(title="PokeAPI and Smogon stand-in")
+    app.state.requests = 0
+
+    # PokeAPI accepts names wherever it accepts IDs
+    resources: dict[tuple[str, str], Path] = {}
+    for path in (fixtures_dir / "pokeapi").glob("*/*.json"):
+        resources[(path.parent.name, path.stem)] = path
+        with open(path) as f:
+            resources[(path.parent.name, json.load(f)["name"])] = path
+
+    # The list endpoints list every name of the name index fixture, whatever the requested page
+    with open(fixtures_dir / "names.json") as f:
+        lists = {
+            kind: json.dumps({
+                "count": len(entries),
+                "next": None,
+                "previous": None,
+                "results": [{"name": name, "url": f"https://pokeapi.co/api/v2/{kind}/{resource_id}/"} for name, resource_id in entries],
+            }).encode()
+            for kind, entries in json.load(f).items()
+        }
+
+    async def serve(request: Request, path: Optional[Path], media_type: str, body: Optional[bytes] = None) -> Response:
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        if body is None and (path is None or not path.is_file()):
+            return JSONResponse({"detail": "Not found."}, status_code=404)
+
+        body = path.read_bytes() if body is None else body
+        headers = {"ETag": f'"{hashlib.sha1(body).hexdigest()[:16]}"', "Last-Modified": FIXTURES_LAST_MODIFIED}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type=media_type, headers=headers)
+
+    @app.get("/api/v2/{resource}/{key}/")
+    async def poke_api(resource: str, key: str, request: Request):
+        return await serve(request, resources.get((resource, key.lower())), "application/json")
+
+    # HttpTool drops the trailing slash of URLs with a query string, PokeAPI serves both
+    @app.get("/api/v2/{resource}")
+    @app.get("/api/v2/{resource}/")
+    async def poke_api_list(resource: str, request: Request):
+        return await serve(request, None, "application/json", lists.get(resource))
+
+    @app.get("/stats/{month}/{filename}")
+    async def smogon_stats(month: str, filename: str, request: Request):
+        return await serve(request, fixtures_dir / "smogon" / month / filename, "text/plain")
+
+    @app.get("/PokeAPI/pokeapi/master/openapi.yml")
+    async def poke_api_spec(request: Request):
+        return await serve(request, fixtures_dir / "openapi.yml", "application/yaml")
+
+    return app
+
+def prepare_cache_dir(fixtures_dir: Path = FIXTURES_DIR):
+    """
+    Compiles the tool artifact, the local Pokédex dataset and the name index from the fixtures into POKEDEX_CACHE_DIR,
+    and clears the response and Smogon caches, so every runtime starts cold and never needs the network.
+    """
+    from tools import name_index, pokedex_dataset
+    from tools.cache import DEFAULT_CACHE_DIR
+    from tools.pokeapi import compile_tool_artifact, save_tool_artifact
+
+    spec = (fixtures_dir / "openapi.yml").read_bytes()
+    etag = f'"{hashlib.sha1(spec).hexdigest()[:16]}"'
+    save_tool_artifact(compile_tool_artifact(spec.decode(), etag))
+
+    with open(fixtures_dir / "pokedex.json") as f:
+        pokedex_dataset.PokedexDataset.from_rows(json.load(f)).save()
+    pokedex_dataset._dataset = None
+
+    with open(fixtures_dir / "names.json") as f:
+        name_index.NameIndex(json.load(f)).save()
+    name_index._name_index = None
+
+    for path in DEFAULT_CACHE_DIR.glob("responses.sqlite*"):
+        path.unlink()
+    shutil.rmtree(DEFAULT_CACHE_DIR / "smogon", ignore_errors=True)
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """
+    Mounts an ASGI application like httpx.ASGITransport, which collects the whole response body before
+    returning it, but hands the body over chunk by chunk as the application sends it. Streamed completions
+    then arrive at the pace the stand-in produces them, as they would over the network.
+    """
+    def __init__(self, app: FastAPI):
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([part async for part in request.stream])
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": request.method,
+            "headers": [(key.lower(), value) for key, value in request.headers.raw],
+            "scheme": request.url.scheme,
+            "path": request.url.path,
+            "raw_path": request.url.raw_path.split(b"?")[0],
+            "query_string": request.url.query,
+            "server": (request.url.host, request.url.port),
+            "client": ("127.0.0.1", 123),
+            "root_path": "",
+        }
+        response_started: asyncio.Future = asyncio.get_running_loop().create_future()
+        body_parts: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        request_sent = False
+
+        async def receive() -> dict[str, Any]:
+            nonlocal request_sent
+            if request_sent:
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: dict[str, Any]):
+            if message["type"] == "http.response.start":
+                response_started.set_result(message)
+            elif message["type"] == "http.response.body":
+                body_parts.put_nowait(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body_parts.put_nowait(None)
+
+        async def run_app():
+            try:
+                await self.app(scope, receive, send)
+            except Exception as e:
+                if not response_started.done():
+                    response_started.set_exception(e)
+            finally:
+                body_parts.put_nowait(None)
+
+        task = asyncio.create_task(run_app())
+        message = await response_started
+        return httpx.Response(
+            message["status"],
+            headers=message.get("headers", []),
+            stream=_QueueStream(body_parts, task, disconnected),
+        )
+
+class _QueueStream(httpx.AsyncByteStream):
+    def __init__(self, body_parts: asyncio.Queue, task: asyncio.Task, disconnected: asyncio.Event):
+        self._body_parts = body_parts
+        self._task = task
+        self._disconnected = disconnected
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        while (part := await self._body_parts.get()) is not None:
+            yield part
+
+    async def aclose(self):
+        self._disconnected.set()
+        self._task.cancel()
+
+class StandIns:
+    def __init__(
+        self,
+        scenarios: Optional[list[dict[str, Any]]] = None,
+        llm_latency: Union[float, dict[str, float]] = 0.0,
+        web_latency: float = 0.0,
+        llm_chunk_latency: float = 0.0,
+    ):
+        self.scenarios = scenarios or load_scenarios()
+        self.openai = create_openai_stand_in(self.scenarios, llm_latency, llm_chunk_latency)
+        self.web = create_web_stand_in(latency=web_latency)
+
+    def create_runtime(self):
+        from openai import AsyncOpenAI
+        from runtime import PokedexRuntime
+
+        llm = AsyncOpenAI(
+            api_key="stand-in",
+            http_client=httpx.AsyncClient(transport=StreamingASGITransport(self.openai)),
+        )
+        return PokedexRuntime(http_transport=httpx.ASGITransport(app=self.web), llm=llm)